@@ -0,0 +1,101 @@
+"""
+Measures the memory and the build time of trees of containers, on an inline-heavy and a table-heavy page.
+The inline-heavy page is a synthetic page made of markup and links, contextualized by the ContextManager.
+The context manager doesn't handle tables yet: the table-heavy tree is built directly from rows of cells.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_containers [--lines N] [--rows N] [--cells N] [--repeat N]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+from benchmarks.corpus import generate_corpus
+from bootstraparse.modules import context_mngr, parser, preparser, sitecreator, syntax
+
+INLINE_MIX = {"text": 10, "markup": 60, "link": 30, "blank": 0, "header": 0, "display": 0, "ulist": 0, "olist": 0,
+              "section": 0, "alias": 0, "image": 0}
+
+
+def inline_page(lines):
+    """
+    Returns the text of an inline-heavy synthetic page, after the preparser.
+    :type lines: int
+    :rtype: str
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        origin = os.path.join(folder, "site")
+        page = generate_corpus(origin, pages=1, lines=lines, import_depth=0, mix=INLINE_MIX)[0]
+        env = sitecreator.create_environment(origin, os.path.join(folder, "output"), parse_cache=False)
+        return preparser.PreParser(page, env).do_replacements().getvalue()
+
+
+def table_tree(rows, cells):
+    """
+    Builds rows of cells, each cell holding a text container.
+    :type rows: int
+    :type cells: int
+    :rtype: list[context_mngr.BaseContainer]
+    """
+    return [
+        context_mngr.TableRowContainer([
+            context_mngr.TableCellContainer([context_mngr.TextContainer([syntax.TextToken((f"cell {row} {cell}",))])])
+            for cell in range(cells)
+        ]) for row in range(rows)
+    ]
+
+
+def measure(build, repeat, prepare=lambda: None):
+    """
+    Returns the best duration of build, and the memory it allocated that is still in use after it.
+    :param build: The function building the tree, from the output of prepare.
+    :param repeat: The number of runs.
+    :param prepare: The function preparing the input of build, it is neither timed nor measured.
+    :type build: collections.abc.Callable[[object], object]
+    :type repeat: int
+    :type prepare: collections.abc.Callable[[], object]
+    :return: The duration in seconds, and the memory in bytes.
+    :rtype: (float, int)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        argument = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        build(argument)
+        best = min(best, time.perf_counter() - start)
+    argument = prepare()
+    gc.collect()
+    tracemalloc.start()
+    result = build(argument)  # noqa F841 (kept alive while measuring)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return best, memory
+
+
+def main(_args=None):
+    argument_parser = argparse.ArgumentParser(description="Memory and build time of trees of containers.")
+    argument_parser.add_argument("--lines", type=int, default=5000, help="lines of the inline-heavy page.")
+    argument_parser.add_argument("--rows", type=int, default=5000, help="rows of the table-heavy tree.")
+    argument_parser.add_argument("--cells", type=int, default=8, help="cells per row of the table-heavy tree.")
+    argument_parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept.")
+    args = argument_parser.parse_args(_args)
+
+    text = inline_page(args.lines)
+    results = {
+        "inline": measure(lambda tokens: context_mngr.ContextManager(tokens)(), args.repeat,
+                          lambda: parser.parse_line(StringIO(text))),
+        "table": measure(lambda _: table_tree(args.rows, args.cells), args.repeat),
+    }
+    for name, (duration, memory) in results.items():
+        print(f"{name:6} tree: {duration * 1000:9.2f} ms, {memory / 2 ** 20:7.2f} MB")
+    return results
+
+
+if __name__ == "__main__":
+    main()
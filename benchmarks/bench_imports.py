@@ -0,0 +1,78 @@
+"""
+Measures the search of the import directives of a large synthetic site where only a few pages import a file,
+by PreParser.parse_import_list and by the former search of syntax.rgx_import_file on every line.
+The files are read beforehand through a SourceCache, only the search is timed.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_imports [--pages N] [--lines N] [--importing N] [--repeat N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus, write_file
+from bootstraparse.modules import cache, preparser, sitecreator, syntax
+
+
+def grammar_import_list(pp):
+    """
+    Returns the import list of a file the way the preparser used to: searching every line with pyparsing.
+    :type pp: preparser.PreParser
+    :rtype: list[(str, int)]
+    """
+    import_list = []
+    for line_count, line in enumerate(pp.source_lines()):
+        results = syntax.rgx_import_file.search_string(line)
+        if results:
+            import_list += [(pp.relative_path_resolver(e.rstrip()), line_count) for e in results[0]]
+    return import_list
+
+
+def best_time(function, repeat):
+    """
+    Calls function repeat times and returns the best duration and the output.
+    :type function: collections.abc.Callable[[], list]
+    :type repeat: int
+    :rtype: (float, list)
+    """
+    best, output = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function()
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main(_args=None):
+    argument_parser = argparse.ArgumentParser(description="Search time of the import directives of a large site.")
+    argument_parser.add_argument("--pages", type=int, default=200, help="number of pages.")
+    argument_parser.add_argument("--lines", type=int, default=500, help="lines of every page.")
+    argument_parser.add_argument("--importing", type=int, default=5, help="number of pages importing a partial.")
+    argument_parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept.")
+    args = argument_parser.parse_args(_args)
+
+    with tempfile.TemporaryDirectory() as folder:
+        origin = os.path.join(folder, "site")
+        pages = generate_corpus(origin, pages=args.pages, lines=args.lines, import_depth=0)
+        write_file(os.path.join(origin, "partials", "_shared.bpr"), ["shared"])
+        for page in pages[:args.importing]:
+            with open(page, "a") as f:
+                f.write(":: <../partials/_shared.bpr>\n")
+        env = sitecreator.create_environment(origin, os.path.join(folder, "output"), parse_cache=False)
+        env.source_cache = cache.SourceCache()
+        for page in pages:
+            env.source_cache.lines(page)
+
+        scanner, output = best_time(lambda: [preparser.PreParser(p, env).parse_import_list() for p in pages],
+                                    args.repeat)
+        grammar, expected = best_time(lambda: [grammar_import_list(preparser.PreParser(p, env)) for p in pages],
+                                      args.repeat)
+        assert output == expected and sum(map(len, output)) == args.importing
+    print(f"{args.pages} pages, {args.importing} importing: scanner {scanner * 1000:9.2f} ms, "
+          f"grammar {grammar * 1000:9.2f} ms")
+    return {"scanner": scanner, "grammar": grammar}
+
+
+if __name__ == "__main__":
+    main()
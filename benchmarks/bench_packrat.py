@@ -0,0 +1,70 @@
+"""
+Measures the per-line throughput of syntax.line with pyparsing's packrat memoization on and off.
+Every line of the .bpr files of a corpus is parsed, after the preparser expanded its imports and replacements.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_packrat [corpus] [--repeat N] [--cache-size N]
+"""
+
+import argparse
+import os
+import time
+
+from bootstraparse.modules import sitecreator, syntax, preparser, pathresolver
+
+EXAMPLE_CORPUS = pathresolver.b_path("../../example_userfiles")
+
+
+def corpus_lines(origin):
+    """
+    Returns every line the parser receives when building a website.
+    :param origin: The path of the website.
+    :type origin: str
+    :rtype: list[str]
+    """
+    env = sitecreator.create_environment(origin, os.devnull, parse_cache=False)
+    lines = []
+    for root, _, files in os.walk(origin):
+        for file in sorted(files):
+            if file.endswith(".bpr") and not file.startswith("_"):
+                lines += preparser.PreParser(os.path.join(root, file), env).do_replacements().readlines()
+    return lines
+
+
+def lines_per_second(lines, repeat):
+    """
+    Parses all the lines repeat times and returns the best throughput.
+    :type lines: list[str]
+    :type repeat: int
+    :rtype: float
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            syntax.line.parseString(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main(_args=None):
+    parser = argparse.ArgumentParser(description="Per-line parsing throughput with and without packrat.")
+    parser.add_argument("corpus", nargs="?", default=EXAMPLE_CORPUS, help="folder of .bpr files to parse.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept.")
+    parser.add_argument("--cache-size", type=int, default=128, help="size of the packrat cache.")
+    args = parser.parse_args(_args)
+
+    lines = corpus_lines(args.corpus)
+    results = {}
+    for enabled in (False, True):
+        syntax.set_packrat(enabled, args.cache_size)
+        results[enabled] = lines_per_second(lines, args.repeat)
+    syntax.set_packrat(False)
+
+    print(f"{len(lines)} lines from {args.corpus}")
+    print(f"packrat off: {results[False]:10.0f} lines/s")
+    print(f"packrat on:  {results[True]:10.0f} lines/s ({results[True] / results[False]:.2f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    main()
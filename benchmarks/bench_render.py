@@ -0,0 +1,97 @@
+"""
+Measures the export of deep and wide trees of containers, by context_mngr.render and by the former recursive export
+(every container concatenating the output of its children), which fails with a RecursionError on deep trees.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_render [--depth N] [--width N] [--repeat N]
+"""
+
+import argparse
+import time
+
+from bootstraparse.modules import config, context_mngr, export, pathresolver, syntax
+
+
+def deep_tree(depth):
+    """
+    Returns depth nested emphasis containers around a text container.
+    :type depth: int
+    :rtype: context_mngr.BaseContainer
+    """
+    container = context_mngr.TextContainer([syntax.TextToken(["text"])])
+    for i in range(depth):
+        container = (context_mngr.EtEmContainer if i % 2 else context_mngr.EtStrongContainer)([container])
+    return container
+
+
+def wide_tree(width):
+    """
+    Returns a container holding width strong containers.
+    :type width: int
+    :rtype: context_mngr.BaseContainer
+    """
+    return context_mngr.EtEmContainer([
+        context_mngr.EtStrongContainer([context_mngr.TextContainer([syntax.TextToken([f"text {i}"])])])
+        for i in range(width)
+    ])
+
+
+def recursive_export(container, exm):
+    """
+    Exports a tree of text, em and strong containers the way containers used to: recursively, with string concatenation.
+    :type container: context_mngr.BaseContainer
+    :type exm: export.ExportManager
+    :rtype: str
+    """
+    if isinstance(container, context_mngr.TextContainer):
+        output = ""
+        for element in container.content:
+            output += element.content[0]
+        return output
+    start, end = exm(export.ExportRequest(container.type, container.subtype))
+    output = ""
+    for element in container.content:
+        output += recursive_export(element, exm) + " "
+    return start + output[:-1] + end
+
+
+def best_time(function, repeat):
+    """
+    Calls function repeat times and returns the best duration and the output, or None if it overflowed the stack.
+    :type function: collections.abc.Callable[[], str]
+    :type repeat: int
+    :rtype: (float | None, str | None)
+    """
+    best, output = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            output = function()
+        except RecursionError:
+            return None, None
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main(_args=None):
+    parser = argparse.ArgumentParser(description="Export time of deep and wide trees of containers.")
+    parser.add_argument("--depth", type=int, default=10000, help="nesting level of the deep tree.")
+    parser.add_argument("--width", type=int, default=100000, help="number of children of the wide tree.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept.")
+    args = parser.parse_args(_args)
+
+    exm = export.ExportManager(config.ConfigLoader(pathresolver.b_path("configs/")),
+                               config.ConfigLoader(pathresolver.b_path("templates/")))
+    results = {}
+    for name, tree in (("deep", deep_tree(args.depth)), ("wide", wide_tree(args.width))):
+        rendered, output = best_time(lambda: export.ContextConverter([tree], exm, name).process_pile().getvalue(),
+                                     args.repeat)
+        recursive, expected = best_time(lambda: recursive_export(tree, exm), args.repeat)
+        assert expected is None or expected == output
+        results[name] = {"render": rendered, "recursive": recursive}
+        print(f"{name:5} tree: render {rendered * 1000:9.2f} ms, recursive " +
+              (f"{recursive * 1000:9.2f} ms" if recursive is not None else "RecursionError"))
+    return results
+
+
+if __name__ == "__main__":
+    main()
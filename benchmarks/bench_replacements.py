@@ -0,0 +1,94 @@
+"""
+Measures the replacement of images and aliases on an alias-heavy and an alias-free synthetic page,
+by PreParser.parse_shortcuts_and_images and by the former per-line pyparsing of syntax.line_to_replace.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_replacements [--lines N] [--repeat N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks.corpus import generate_corpus
+from bootstraparse.modules import preparser, sitecreator, syntax
+
+PAGES = {
+    "alias-heavy": {"alias": 40, "image": 20},
+    "alias-free": {"alias": 0, "image": 0},
+}
+
+
+def grammar_replacements(pp, text):
+    """
+    Replaces the images and aliases of a text the way the preparser used to: parsing every line with pyparsing.
+    :type pp: preparser.PreParser
+    :type text: str
+    :rtype: str
+    """
+    output = StringIO()
+    for line in StringIO(text).readlines():
+        for match in syntax.line_to_replace.parse_string(line):
+            if match.label == 'text':
+                output.write(match.content[0])
+            elif match.label == 'image':
+                output.write(pp.get_image_from_config(match.content.image_name, match.content.optional))
+            elif match.label == 'alias':
+                output.write(pp.get_alias_from_config(match.content.alias_name, match.content.optional))
+        output.write("\n")
+    return output.getvalue()
+
+
+def engine_replacements(pp, text):
+    """
+    Replaces the images and aliases of a text with PreParser.parse_shortcuts_and_images.
+    :type pp: preparser.PreParser
+    :type text: str
+    :rtype: str
+    """
+    pp.new_temporary_files()
+    pp.file_with_all_imports.write(text)
+    pp.file_with_all_imports.seek(0)
+    return pp.parse_shortcuts_and_images().getvalue()
+
+
+def best_time(function, repeat):
+    """
+    Calls function repeat times and returns the best duration and the output.
+    :type function: collections.abc.Callable[[], str]
+    :type repeat: int
+    :rtype: (float, str)
+    """
+    best, output = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function()
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def main(_args=None):
+    argument_parser = argparse.ArgumentParser(description="Replacement time of images and aliases.")
+    argument_parser.add_argument("--lines", type=int, default=5000, help="lines of every page.")
+    argument_parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is kept.")
+    args = argument_parser.parse_args(_args)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name, mix in PAGES.items():
+            origin = os.path.join(folder, name)
+            page = generate_corpus(origin, pages=1, lines=args.lines, import_depth=0, mix=mix)[0]
+            env = sitecreator.create_environment(origin, os.path.join(folder, name + "_output"), parse_cache=False)
+            pp = preparser.PreParser(page, env)
+            text = pp.expand()
+            engine, output = best_time(lambda: engine_replacements(pp, text), args.repeat)
+            grammar, expected = best_time(lambda: grammar_replacements(pp, text), args.repeat)
+            assert output == expected
+            results[name] = {"engine": engine, "grammar": grammar}
+            print(f"{name:11} page: engine {engine * 1000:9.2f} ms, grammar {grammar * 1000:9.2f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main()
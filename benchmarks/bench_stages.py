@@ -0,0 +1,122 @@
+"""
+Times every stage of the build of a synthetic corpus separately, and outputs the results as JSON.
+Stages: replacements (PreParser.do_replacements, imports included), parse (parser.parse_line),
+context (ContextManager.__call__), export (ContextConverter.process_pile) and write.
+Usage:
+ - PYTHONPATH=src python -m benchmarks.bench_stages [--pages N] [--lines N] [--import-depth N] [--seed N]
+                                                    [--mix kind=weight ...] [--repeat N] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pyparsing as pp
+
+from benchmarks.corpus import generate_corpus, add_corpus_arguments, parse_mix, DEFAULT_MIX
+from bootstraparse.modules import sitecreator, preparser, parser, context_mngr, export
+
+STAGES = ("replacements", "parse", "context", "export", "write")
+
+
+def time_pages(pages, env, destination):
+    """
+    Builds every page once, timing each stage.
+    :param pages: The paths of the pages.
+    :param env: The environment object.
+    :param destination: The folder the pages are written to.
+    :type pages: list[str]
+    :type env: bootstraparse.modules.environment.Environment
+    :type destination: str
+    :return: The duration of each stage for each page, and the number of lines parsed.
+    :rtype: (dict[str, list[float]], int)
+    """
+    timings = {stage: [] for stage in STAGES}
+    lines = 0
+    dict_of_imports = {}
+    parser.line_memo.clear()
+    if env.source_cache is not None:  # Like build_website, every run reads and expands the sources again
+        env.source_cache.clear()
+    for page in pages:
+        start = time.perf_counter()
+        io = preparser.PreParser(page, env, dict_of_imports=dict_of_imports).do_replacements()
+        replaced = time.perf_counter()
+        lines += io.getvalue().count("\n")
+        tokens = parser.parse_line(io)
+        parsed = time.perf_counter()
+        containers = context_mngr.ContextManager(tokens, name=os.path.basename(page))()
+        contextualized = time.perf_counter()
+        output = export.ContextConverter(containers, env.export_mngr, page).process_pile().getvalue()
+        exported = time.perf_counter()
+        with open(os.path.join(destination, os.path.basename(page) + ".html"), "w") as f:
+            f.write(output)
+        written = time.perf_counter()
+        for stage, duration in zip(STAGES, (replaced - start, parsed - replaced, contextualized - parsed,
+                                            exported - contextualized, written - exported)):
+            timings[stage].append(duration)
+    return timings, lines
+
+
+def run(args):
+    """
+    Generates the corpus, times it args.repeat times and returns the best run of every stage.
+    :type args: argparse.Namespace
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        origin = os.path.join(folder, "site")
+        destination = os.path.join(folder, "output")
+        os.makedirs(destination)
+        pages = generate_corpus(origin, args.pages, args.lines, args.import_depth, args.seed, parse_mix(args.mix))
+        env = sitecreator.create_environment(origin, destination, parse_cache=False)
+        best = {}
+        lines = 0
+        for _ in range(args.repeat):
+            timings, lines = time_pages(pages, env, destination)
+            for stage, durations in timings.items():
+                if stage not in best or sum(durations) < sum(best[stage]):
+                    best[stage] = durations
+
+    return {
+        "benchmark": "stages",
+        "corpus": {"pages": args.pages, "lines": args.lines, "import_depth": args.import_depth,
+                   "seed": args.seed, "mix": dict(DEFAULT_MIX, **parse_mix(args.mix))},
+        "environment": {"python": platform.python_version(), "pyparsing": pp.__version__,
+                        "platform": platform.platform()},
+        "repeat": args.repeat,
+        "lines_parsed": lines,
+        "stages": {
+            stage: {
+                "total": sum(durations),
+                "median_per_page": statistics.median(durations),
+                "max_per_page": max(durations),
+                "lines_per_second": lines / sum(durations) if sum(durations) else None,
+            } for stage, durations in best.items()
+        },
+    }
+
+
+def main(_args=None):
+    argument_parser = argparse.ArgumentParser(description="Times every stage of the build of a synthetic corpus.")
+    add_corpus_arguments(argument_parser)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="number of runs, the best one of each stage is kept.")
+    argument_parser.add_argument("--output", help="file the JSON results are written to (default: standard output).")
+    args = argument_parser.parse_args(_args)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return results
+
+
+if __name__ == "__main__":
+    main()
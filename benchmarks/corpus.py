@@ -0,0 +1,225 @@
+"""
+Seeded generator of synthetic websites, the corpora the benchmarks are run on.
+A corpus is made of pages of roughly the same number of lines, each importing a chain of partials,
+with a configurable mix of text, markup, headers, lists, tables, structural elements, aliases and images.
+The same parameters and seed always produce the same files.
+Usage:
+ - from benchmarks.corpus import generate_corpus
+ - generate_corpus(folder, pages=50, lines=200, import_depth=2, seed=0) -> list of the pages written
+ - PYTHONPATH=src python -m benchmarks.corpus folder [--pages N] [--lines N] [--import-depth N] [--seed N] [--mix kind=weight ...]
+"""
+
+import argparse
+import os
+import random
+
+# Relative weights of the kinds of blocks a page is made of.
+# Tables and blockquotes are parsed, but not handled by the context manager yet: they are left out by default.
+DEFAULT_MIX = {
+    "text": 30, "markup": 15, "link": 5, "blank": 10,
+    "header": 5, "display": 2, "ulist": 8, "olist": 5,
+    "section": 8, "alias": 5, "image": 3,
+    "table": 0, "quote": 0,
+}
+
+WORDS = (
+    "bootstrap parse page site static html markup element container template export section header "
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip"
+).split()
+STRUCTURAL_ELEMENTS = ("div", "section", "article", "aside", "header", "nav")
+CLASSES = ("container", "row", "col-md-6", "text-center", "py-3", "card", "blue")
+ALIASES = {
+    "site_name": "Synthetic site",
+    "copyright": "Copyright (c) 2022, all rights reserved.",
+    "greeting": "Hello {}, welcome to {}",
+    "signature": "Written by {author}",
+}
+IMAGES = {"logo": "logo.png", "banner": "banner_{}.png", "photo": "photo.jpg"}
+
+
+class PageWriter:
+    """
+    Writes the blocks of a page with a seeded random generator, until the page has enough lines.
+    """
+    def __init__(self, rng, mix, max_nesting=3):
+        """
+        :param rng: The random generator.
+        :param mix: The relative weights of the kinds of blocks.
+        :param max_nesting: The maximum depth of nested structural elements.
+        :type rng: random.Random
+        :type mix: dict[str, int]
+        :type max_nesting: int
+        """
+        self.rng = rng
+        self.kinds = [kind for kind, weight in mix.items() if weight > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.max_nesting = max_nesting
+        self.lines = []
+
+    def words(self, low=3, high=12):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high)))
+
+    def optional(self):
+        if self.rng.random() < 0.3:
+            return "{{" + " ".join(self.rng.sample(CLASSES, 2)) + "}}"
+        return ""
+
+    def markup(self):
+        words = self.words().split()
+        start = self.rng.randrange(len(words))
+        end = self.rng.randint(start + 1, len(words))
+        marker = self.rng.choice(("*", "**", "~~", "__"))
+        return " ".join(words[:start] + [marker + " ".join(words[start:end]) + marker] + words[end:])
+
+    def block(self, kind, nesting):
+        """
+        Appends one block of the given kind to the page.
+        :type kind: str
+        :type nesting: int
+        """
+        rng = self.rng
+        if kind == "text":
+            self.lines += [self.words() for _ in range(rng.randint(1, 4))]
+        elif kind == "markup":
+            self.lines.append(self.markup())
+        elif kind == "link":
+            self.lines.append(f"{self.words(1, 5)} [{self.words(1, 3)}]('https://example.com/{rng.choice(WORDS)}.html')")
+        elif kind == "blank":
+            self.lines.append("")
+        elif kind == "header":
+            level = "#" * rng.randint(1, 6)
+            self.lines.append(f"{level} {self.words(1, 6)} {level}{self.optional()}")
+        elif kind == "display":
+            level = "!" * rng.randint(1, 3)
+            self.lines.append(f"{level} {self.words(1, 6)} {level}{self.optional()}")
+        elif kind in ("ulist", "olist"):
+            marker = "-" if kind == "ulist" else "#."
+            self.lines += [f"{marker} {self.words()}" for _ in range(rng.randint(2, 6))]
+        elif kind == "section":
+            if nesting >= self.max_nesting:
+                return self.block("text", nesting)
+            element = rng.choice(STRUCTURAL_ELEMENTS)
+            self.lines.append(f"<<{element}")
+            for _ in range(rng.randint(1, 5)):
+                self.block(self.choose(), nesting + 1)
+            self.lines.append(f"{element}>>{self.optional()}")
+        elif kind == "alias":
+            alias = rng.choice(list(ALIASES))
+            arguments = {"greeting": "['visitor', 'home']", "signature": "[author='someone']"}.get(alias, "")
+            self.lines.append(f"{self.words(0, 4)} @[{alias}]{arguments} {self.words(0, 4)}".strip())
+        elif kind == "image":
+            image = rng.choice(list(IMAGES))
+            self.lines.append(f"@{{{image}}}" + ("[2]" if image == "banner" else "") + self.optional())
+        elif kind == "table":
+            columns = rng.randint(2, 5)
+            self.lines.append("|" + "|".join(self.words(1, 3) for _ in range(columns)) + "|")
+            self.lines.append("|" + "|".join(":-" for _ in range(columns)) + "|")
+            self.lines += ["|" + "|".join(self.words(1, 4) for _ in range(columns)) + "|" for _ in range(rng.randint(1, 6))]
+        elif kind == "quote":
+            self.lines += [f"> {self.words()}" for _ in range(rng.randint(1, 3))] + [f"> -- {self.words(1, 2)}"]
+
+    def choose(self):
+        return self.rng.choices(self.kinds, self.weights)[0]
+
+    def write(self, number_of_lines):
+        """
+        Returns a page of at least number_of_lines lines (a block started before the limit is completed).
+        :type number_of_lines: int
+        :rtype: list[str]
+        """
+        self.lines = []
+        while len(self.lines) < number_of_lines:
+            self.block(self.choose(), 0)
+        return self.lines
+
+
+def write_file(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_configs(folder):
+    """
+    Writes the aliases and images used by the generated pages.
+    :type folder: str
+    """
+    lines = ["shortcuts:"] + [f"  {name}: '{value}'" for name, value in ALIASES.items()]
+    lines += ["images:"] + [f"  {name}: '{value}'" for name, value in IMAGES.items()]
+    write_file(os.path.join(folder, "configs", "aliases.yaml"), lines)
+
+
+def generate_corpus(folder, pages=50, lines=200, import_depth=2, seed=0, mix=None):
+    """
+    Writes a synthetic website in folder.
+    Every page imports one of several chains of partials (files starting with an underscore, which aren't built),
+    each partial of a chain importing the next one, import_depth partials deep.
+    :param folder: The folder the website is written to.
+    :param pages: The number of pages.
+    :param lines: The number of lines of each page, without its imports.
+    :param import_depth: The length of the chains of partials, 0 for pages without imports.
+    :param seed: The seed of the random generator.
+    :param mix: The relative weights of the kinds of blocks, updating DEFAULT_MIX.
+    :type folder: str
+    :type pages: int
+    :type lines: int
+    :type import_depth: int
+    :type seed: int
+    :type mix: dict[str, int]
+    :return: The paths of the pages written.
+    :rtype: list[str]
+    """
+    rng = random.Random(seed)
+    writer = PageWriter(rng, dict(DEFAULT_MIX, **(mix or {})))
+    write_configs(folder)
+
+    chains = max(1, pages // 10) if import_depth > 0 else 0
+    for chain in range(chains):
+        for depth in range(import_depth):
+            partial = writer.write(max(1, lines // 10))
+            if depth + 1 < import_depth:
+                partial.append(f":: <_partial_{chain}_{depth + 1}.bpr>")
+            write_file(os.path.join(folder, "partials", f"_partial_{chain}_{depth}.bpr"), partial)
+
+    written = []
+    for page in range(pages):
+        path = os.path.join(folder, "pages", f"page_{page}.bpr")
+        content = writer.write(lines)
+        if chains:
+            content.insert(rng.randrange(len(content) + 1), f":: <../partials/_partial_{rng.randrange(chains)}_0.bpr>")
+        write_file(path, content)
+        written.append(path)
+    return written
+
+
+def parse_mix(values):
+    """
+    Parses the kind=weight arguments of the command line.
+    :type values: list[str]
+    :rtype: dict[str, int]
+    """
+    mix = {}
+    for value in values:
+        kind, _, weight = value.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown kind of block {kind}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[kind] = int(weight)
+    return mix
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument("--pages", type=int, default=50, help="number of pages.")
+    parser.add_argument("--lines", type=int, default=200, help="number of lines per page.")
+    parser.add_argument("--import-depth", type=int, default=2, help="length of the chains of imported partials.")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator.")
+    parser.add_argument("--mix", nargs="*", default=[], metavar="KIND=WEIGHT",
+                        help=f"weights of the kinds of blocks, among {', '.join(DEFAULT_MIX)}.")
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Writes a synthetic website to benchmark bootstraparse.")
+    argument_parser.add_argument("folder", help="the folder the website is written to.")
+    add_corpus_arguments(argument_parser)
+    args = argument_parser.parse_args()
+    generate_corpus(args.folder, args.pages, args.lines, args.import_depth, args.seed, parse_mix(args.mix))
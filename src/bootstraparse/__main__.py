@@ -2,25 +2,69 @@
 
 """ Main program, use this to start parsing"""
 
-from bootstraparse.modules import sitecreator, error_mngr
+from bootstraparse.modules import sitecreator, watcher, error_mngr
 import argparse
+import os
 import sys
 
 
 def parse(_args):
+    if _args and _args[0] == "watch":
+        return parse_watch(_args[1:])
     parser = argparse.ArgumentParser(
         prog="bootstraparse",
         description='Parses a folder for all .bpr files and magically recreates the same architecture '
-                    'with html translated files.'
+                    'with html translated files. Use "bootstraparse watch" to rebuild it on every change.'
     )
+    add_common_arguments(parser)
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help="rebuild every page, even the ones that did not change since the last build.")
+    parser.add_argument('--profile-stages', action='store_true',
+                        help="time every stage of every page, the report is written to "
+                             "destination/.bootstraparse/profile_stages.json. Every page is rebuilt, without the "
+                             "parse cache.")
+    parser.add_argument('--profile-page', dest='profile_pages', action='append', metavar='GLOB',
+                        help="build the pages matching GLOB (relative to origin) in cProfile, and dump the stats "
+                             "to a .pstats file next to their output. These pages are always rebuilt, without the "
+                             "parse cache. Can be given several times.")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="track the memory allocated by every stage of every page with tracemalloc, the report is "
+                             "written to destination/.bootstraparse/memory_report.json. Every page is rebuilt, "
+                             "without the parse cache.")
+    # parser.add_argument("-v", "verbosity")
+    return parser.parse_args(_args, namespace=argparse.Namespace(command="build"))
+
+
+def parse_watch(_args):
+    parser = argparse.ArgumentParser(
+        prog="bootstraparse watch",
+        description='Builds the website, then watches the origin folder and rebuilds the pages affected by every change.'
+    )
+    add_common_arguments(parser)
+    parser.add_argument('-i', '--interval', type=float, default=0.5,
+                        help="number of seconds between two checks of the origin folder (default: 0.5).")
+    return parser.parse_args(_args, namespace=argparse.Namespace(command="watch"))
+
+
+def add_common_arguments(parser):
     parser.add_argument('origin', help='the root folder of all files to parse.')
     parser.add_argument('destination', help="path of the folder where to output all the magic.")
-    # parser.add_argument("-v", "verbosity")
-    return parser.parse_args(_args)
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="number of processes building the pages in parallel (default: the number of CPUs).")
+    parser.add_argument('--no-parse-cache', dest='parse_cache', action='store_false',
+                        help="parse every page again, without reading or filling the parse cache.")
 
 
 if __name__ == "__main__":  # pragma: no cover
     args = parse(sys.argv[1:])
     error_mngr.init_logging(filename=None, loglevel="DEBUG", filemode='w', handler=None)
-    if sitecreator.create_website(args.origin, args.destination) == 0:
+    if args.command == "watch":
+        try:
+            watcher.SiteWatcher(args.origin, args.destination, interval=args.interval, jobs=args.jobs,
+                                parse_cache=args.parse_cache).watch()
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+    elif sitecreator.create_website(args.origin, args.destination, jobs=args.jobs, full_rebuild=args.full_rebuild,
+                                    parse_cache=args.parse_cache, profile_stages=args.profile_stages,
+                                    profile_pages=args.profile_pages, memory_report=args.memory_report) == 0:
         print("Bootstraparse run successful!")
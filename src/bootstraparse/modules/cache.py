@@ -0,0 +1,307 @@
+"""
+Module caching the output of the parser.
+The ParseCache is kept on disk, so that unchanged pages skip pyparsing entirely across runs.
+It is keyed by the hash of the text given to the parser, and is stamped with a version of the grammar:
+any change to syntax.py or to pyparsing empties it.
+The LRUCache is a bounded in-memory mapping, counting its hits and misses.
+Usage:
+ - from bootstraparse.modules.cache import ParseCache
+ - cache = ParseCache(folder, max_size=64 * 2 ** 20)
+ - cache.get(text) -> list of tokens, or None if the text was never parsed
+ - cache.put(text, tokens)
+ - cache.evict() # removes the least recently used entries above max_size
+ - from bootstraparse.modules.cache import LRUCache
+ - memo = LRUCache(max_size=4096)
+ - memo.get(key) -> value, or None ; memo.put(key, value) ; memo.hit_rate
+The SourceCache holds the lines of the source files read during a build, so that every file is opened only once.
+ - from bootstraparse.modules.cache import SourceCache
+ - sources = SourceCache()
+ - sources.lines(path) -> tuple of the lines of the file, shared by every caller
+ - sources.expand(path, expand_function) -> text of the file with its imports done, expanded once per build
+ - sources.clear() # before a new build
+"""
+
+import hashlib
+import locale
+import os
+import pickle
+import re
+from collections import OrderedDict
+
+import pyparsing as pp
+
+from bootstraparse.modules import syntax, error_mngr
+
+# Encoding of the source files, the default of open() in text mode
+SOURCE_ENCODING = locale.getpreferredencoding(False)
+# A line and its \n, or the last line if the text does not end with one
+_rgx_line = re.compile(r"[^\n]*\n|[^\n]+")
+VERSION_FILE = "VERSION"
+CACHE_FORMAT = 1
+
+
+def grammar_version():
+    """
+    Returns a version of the grammar, which changes whenever the tokens produced by the parser may change.
+    :return: The hexadecimal hash of syntax.py, of the pyparsing version and of the format of the cache.
+    :rtype: str
+    """
+    sha = hashlib.sha256(f"{CACHE_FORMAT};{pp.__version__};{pickle.DEFAULT_PROTOCOL};".encode())
+    with open(syntax.__file__, "rb") as f:
+        sha.update(f.read())
+    return sha.hexdigest()
+
+
+class ParseCache:
+    """
+    Folder of pickled token lists, one file per parsed text, evicted in least recently used order.
+    """
+    def __init__(self, folder, max_size=64 * 2 ** 20):
+        """
+        Opens the cache, emptying it if it was made by another version of the grammar.
+        :param folder: The folder in which the cache is stored.
+        :param max_size: The size in bytes above which the least recently used entries are removed.
+        :type folder: str
+        :type max_size: int
+        """
+        self.folder = folder
+        self.max_size = max_size
+        self.version = grammar_version()
+        self.hits = 0
+        self.misses = 0
+        self.check_version()
+
+    def check_version(self):
+        """
+        Empties the cache if its version stamp doesn't match the current grammar, then stamps it.
+        """
+        version_path = os.path.join(self.folder, VERSION_FILE)
+        try:
+            with open(version_path, "r") as f:
+                if f.read() == self.version:
+                    return
+        except FileNotFoundError:
+            pass
+        os.makedirs(self.folder, exist_ok=True)
+        for path in self.entries():
+            os.remove(path)
+        with open(version_path, "w") as f:
+            f.write(self.version)
+
+    def entries(self):
+        """
+        Returns the paths of all the entries of the cache.
+        :rtype: list[str]
+        """
+        return [entry.path for entry in os.scandir(self.folder) if entry.name.endswith(".pickle")]
+
+    def path(self, text):
+        """
+        Returns the path of the entry of a text.
+        :type text: str
+        :rtype: str
+        """
+        return os.path.join(self.folder, hashlib.sha256(text.encode()).hexdigest() + ".pickle")
+
+    def get(self, text):
+        """
+        Returns the tokens the parser produced for a text, the entry is marked as recently used.
+        :param text: The text given to the parser.
+        :type text: str
+        :return: A fresh copy of the tokens, or None if the text isn't in the cache.
+        :rtype: list[syntax.SemanticType] | None
+        """
+        path = self.path(text)
+        try:
+            with open(path, "rb") as f:
+                tokens = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+            error_mngr.log_message(f"Removing the unreadable parse cache entry {path}.", level="WARNING")
+            os.remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tokens
+
+    def put(self, text, tokens):
+        """
+        Stores the tokens produced for a text, the entry is written atomically so that processes can share the cache.
+        :param text: The text given to the parser.
+        :param tokens: The tokens produced by the parser.
+        :type text: str
+        :type tokens: list[syntax.SemanticType]
+        """
+        path = self.path(text)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(tokens, f)
+        os.replace(temporary, path)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_size.
+        :return: The number of entries removed.
+        :rtype: int
+        """
+        entries = []
+        for path in self.entries():
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+
+class LRUCache:
+    """
+    In-memory mapping keeping at most max_size entries, the least recently used ones are dropped first.
+    """
+    def __init__(self, max_size=4096):
+        """
+        :param max_size: The maximum number of entries, 0 disables the cache.
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the value stored for a key, and marks it as recently used.
+        :param key: The key of the entry.
+        :type key: collections.abc.Hashable
+        :return: The value, or None if the key isn't in the cache.
+        """
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.entries[key]
+
+    def put(self, key, value):
+        """
+        Stores a value, dropping the least recently used entry if the cache is full.
+        :param key: The key of the entry.
+        :param value: The value to store.
+        :type key: collections.abc.Hashable
+        """
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """
+        Returns the proportion of the lookups that found their key.
+        :rtype: float
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def read_lines(path):
+    """
+    Reads the lines of a text file, the same way as open(path, "r").readlines() but with a single open.
+    :param path: The path of the file.
+    :type path: str
+    :rtype: tuple[str]
+    """
+    with open(path, "rb") as f:
+        text = f.read().decode(SOURCE_ENCODING)
+    if "\r" in text:  # Translates the newlines like text mode does
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    # Unlike str.splitlines, only splits on \n (form feeds and other separators stay inside their line)
+    return tuple(_rgx_line.findall(text))
+
+
+class SourceCache:
+    """
+    Lines of the source files read during a build, every file is read once and its lines are shared by every reader.
+    """
+    def __init__(self):
+        self.sources = {}
+        self.reads = 0
+        self.expanded = {}  # Text of the imported files with their imports done, by absolute path
+        self.expansions = 0
+        self.reused_expansions = 0
+        self.reused_size = 0  # Characters of the reused expansions, that were not copied again
+
+    def lines(self, path):
+        """
+        Returns the lines of a file, reading it only the first time.
+        :param path: The path of the file.
+        :type path: str
+        :return: The lines, they must not be modified.
+        :rtype: tuple[str]
+        """
+        path = os.path.abspath(path)
+        lines = self.sources.get(path)
+        if lines is None:
+            lines = self.sources[path] = read_lines(path)
+            self.reads += 1
+        return lines
+
+    def expand(self, path, expand_function):
+        """
+        Returns the text of a file with its imports done, expanding it only the first time.
+        :param path: The path of the file.
+        :param expand_function: The function returning the text of the file with its imports done.
+        :type path: str
+        :type expand_function: collections.abc.Callable[[], str]
+        :rtype: str
+        """
+        path = os.path.abspath(path)
+        text = self.expanded.get(path)
+        if text is None:
+            text = self.expanded[path] = expand_function()
+            self.expansions += 1
+        else:
+            self.reused_expansions += 1
+            self.reused_size += len(text)
+        return text
+
+    def counters(self):
+        """
+        :return: The number of files expanded, of expansions reused and of characters reused so far.
+        :rtype: (int, int, int)
+        """
+        return self.expansions, self.reused_expansions, self.reused_size
+
+    def clear(self):
+        """
+        Forgets every file and expansion, so that the next build reads and expands them again.
+        """
+        self.sources.clear()
+        self.expanded.clear()
+        self.reads = self.expansions = self.reused_expansions = self.reused_size = 0
+
+    def __len__(self):
+        return len(self.sources)
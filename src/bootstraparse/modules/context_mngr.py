@@ -10,17 +10,54 @@ Usage:
  - container = BaseContainer()
  - container[number] -> The number element in the content
  - "class_insert" >> container[number] -> Get an element from one of the mapped methods
+ - render(containers, export_manager, sink.write) -> writes the exported containers to the sink
+Containers are exported without recursion: each one only lists its fragments (strings and child containers),
+and render() walks the tree with an explicit stack.
 """
+import sys
+from types import MappingProxyType
+
 from bootstraparse.modules import syntax, error_mngr, export
 from bootstraparse.modules.error_mngr import MismatchedContainerError, log_exception, log_message, LonelyOptionalError # noqa
 
+# Shared by the containers without map or others
+EMPTY_MAPPING = MappingProxyType({})
+
+
+def render(items, exm, write):
+    """
+    Exports containers to a sink, walking the tree of containers with an explicit stack instead of recursion.
+    :param items: The containers and strings to export, in order.
+    :param exm: ExportManager to use for exporting
+    :param write: The function every fragment of the output is given to, in order.
+    :type items: collections.abc.Iterable[BaseContainer | str]
+    :type exm: export.ExportManager
+    :type write: collections.abc.Callable[[str], object]
+    """
+    stack = [iter(items)]
+    while stack:
+        for item in stack[-1]:
+            if item.__class__ is str:  # Most fragments, checked first
+                write(item)
+            elif isinstance(item, BaseContainer):
+                stack.append(iter(item.fragments(exm)))
+                break
+            else:
+                write(item)
+        else:
+            stack.pop()
+
 
 class BaseContainer:
     """
     Creates container holding all the elements from the start of a parsed element to its end.
+    Containers are slotted, and their map and others dicts are only allocated when something is written to them.
     """
+    __slots__ = ("content", "optionals", "_map", "_others")
     type = None
     subtype = None
+    default_map = EMPTY_MAPPING  # Entries of the map of every container of the class, copied when the map is written to
+    indentation_level = 0  # future: add an indentation level to every token for human readability of the final output
 
     def __init__(self, content=None, optionals=None, others=None):
         """
@@ -33,12 +70,45 @@ class BaseContainer:
         """
         if content is None:
             content = []
-        if others is None:
-            self.others = {}
         self.content = content
-        self.map = {}
         self.optionals = optionals
-        self.indentation_level = 0  # future: add an indentation level to every token for human readability of the final output
+        self._map = None
+        self._others = others
+
+    @property
+    def map(self):
+        """
+        The map of the container, allocated on first access.
+        :rtype : dict
+        """
+        if self._map is None:
+            self._map = dict(self.default_map)
+        return self._map
+
+    @map.setter
+    def map(self, value):
+        self._map = value
+
+    @property
+    def others(self):
+        """
+        The other values of the container, allocated on first access (use get_others to read them without allocating).
+        :rtype : dict[str, str]
+        """
+        if self._others is None:
+            self._others = {}
+        return self._others
+
+    @others.setter
+    def others(self, value):
+        self._others = value
+
+    def get_map(self):
+        """
+        Get the map of the container, without allocating it.
+        :rtype : collections.abc.Mapping
+        """
+        return self.default_map if self._map is None else self._map
 
     def get_content(self, exm, arbitrary_list=None):
         """
@@ -49,13 +119,24 @@ class BaseContainer:
         :type arbitrary_list: list[BaseContainer]
         :rtype : str
         """
-        output = ""
-        if not arbitrary_list:
-            arbitrary_list = self.content
-        for element in arbitrary_list:
+        output = []
+        render(self.content_fragments(exm, arbitrary_list), exm, output.append)
+        return "".join(output)
+
+    def content_fragments(self, exm, arbitrary_list=None):
+        """
+        Lists the fragments of the content of the container: its child containers, separated by spaces.
+        :param exm: ExportManager to use for exporting
+        :param arbitrary_list: List to get the content from (default self.content)
+        :type exm: export.ExportManager
+        :type arbitrary_list: list[BaseContainer]
+        :rtype : list[BaseContainer | str]
+        """
+        fragments = []
+        for element in arbitrary_list or self.content:
             if isinstance(element, BaseContainer):
-                output += element.export(exm) + " "
-        return output[:-1]
+                fragments += (element, " ")
+        return fragments[:-1]
 
     def get_optionals(self):
         """
@@ -69,9 +150,9 @@ class BaseContainer:
         """
         Get the other values of the container.
         :rtype : dict[str, str]
-        :return: The other values of the container
+        :return: The other values of the container (a shared read-only mapping if there are none)
         """
-        return self.others
+        return EMPTY_MAPPING if self._others is None else self._others
 
     def export(self, exm):
         """
@@ -79,11 +160,18 @@ class BaseContainer:
         :type exm: export.ExportManager
         :rtype : str
         """
-        start, end = exm(export.ExportRequest(self.type, self.subtype, self.get_optionals(), self.get_others()))
+        output = []
+        render((self,), exm, output.append)
+        return "".join(output)
 
-        output = start + self.get_content(exm) + end
-
-        return output
+    def fragments(self, exm):
+        """
+        Lists the fragments of the container once exported: the start markup, the content and the end markup.
+        :type exm: export.ExportManager
+        :rtype : list[BaseContainer | str]
+        """
+        start, end = exm(export.ExportRequest(self.type, self.subtype, self.get_optionals(), self.get_others()))
+        return [start, *self.content_fragments(exm), end]
 
     def add(self, other):
         """
@@ -109,7 +197,7 @@ class BaseContainer:
         :return: True if every element is in map, False otherwise
         """
         for o in other:
-            if o not in self.map:
+            if o not in self.get_map():
                 return False
         return True
 
@@ -119,7 +207,7 @@ class BaseContainer:
         :return: None
         """
         print(f'Debug for {self.class_name()} <{id(self)}>')
-        for k, v in self.map.items():
+        for k, v in self.get_map().items():
             print(f'{k} = {v}')
 
     def __len__(self):
@@ -168,7 +256,7 @@ class BaseContainer:
         :type other: str
         :rtype : (syntax.SemanticType | BaseContainer)
         """
-        return self.map[other]()
+        return self.get_map()[other]()
 
     def __eq__(self, other):
         """
@@ -251,80 +339,91 @@ class BaseContainer:
 
 # Define containers all the Enhanced text elements, divs, headers, list and any element that can be a container
 class TextContainer(BaseContainer):
-    def export(self, _):
-        output = ""
+    __slots__ = ()
+
+    def fragments(self, _):
+        fragments = []
         for element in self.content:
             if isinstance(element, syntax.TextToken):
-                output += element.content[0]
+                fragments.append(element.content[0])
             else:
                 log_exception(TypeError(f"{type(element)} found in TextContainer."), level="CRITICAL")
-        return output
+        return ["".join(fragments)]
 
 
 class EtEmContainer(BaseContainer):
+    __slots__ = ()
     type = "inline_elements"
     subtype = "em"
 
 
 class EtStrongContainer(BaseContainer):
+    __slots__ = ()
     type = "inline_elements"
     subtype = "strong"
 
 
 class EtUnderlineContainer(BaseContainer):
+    __slots__ = ()
     type = "inline_elements"
     subtype = "underline"
 
 
 class EtStrikethroughContainer(BaseContainer):
+    __slots__ = ()
     type = "inline_elements"
     subtype = "strikethrough"
 
 
 class EtCustomSpanContainer(BaseContainer):
+    # Not slotted: the subtype of every instance is set when exported
     type = "inline_elements"
 
-    def export(self, exm):
+    def fragments(self, exm):
         self.subtype = "custom_" + self.content[0].content[0] # noqa F821 (self.content[0] is a token, by definition
-        return super().export(exm)
+        return super().fragments(exm)
 
 
 class ReContextContainer(BaseContainer):
+    __slots__ = ()
     children = ""
 
-    def get_content(self, exm, arbitrary_list=None):
+    def content_fragments(self, exm, arbitrary_list=None):
         child_start, child_end = exm(export.ExportRequest(self.type, self.children))  # noqa F821
-        output = "\n"
+        fragments = ["\n"]
         for element in self.content:
             if isinstance(element, syntax.Linebreak):
-                output += "\n"
+                fragments.append("\n")
             else:
-                output += child_start + super().get_content(exm, element.content) + child_end
-        return output
+                fragments += [child_start, *super().content_fragments(exm, element.content), child_end]
+        return fragments
 
 
 class EtUlistContainer(ReContextContainer):
+    __slots__ = ()
     type = "oneline_elements"
     subtype = "ulist"
     children = "list_line"
 
 
 class EtOlistContainer(ReContextContainer):
+    __slots__ = ()
     type = "oneline_elements"
     subtype = "olist"
     children = "list_line"
 
 
 class HyperLinkContainer(BaseContainer):
+    __slots__ = ()
     type = "inline_elements"
     subtype = "link"
 
-    def export(self, exm):
+    def fragments(self, exm):
         self.others["url"] = self.content[0].content.url
-        return super().export(exm)
+        return super().fragments(exm)
 
-    def get_content(self, exm, arbitrary_list=None):
-        return self.content[0].content.text
+    def content_fragments(self, exm, arbitrary_list=None):
+        return [self.content[0].content.text]
 
 
 # class IlImageContainer(BaseContainer):
@@ -332,41 +431,44 @@ class HyperLinkContainer(BaseContainer):
 
 
 class SeContainer(BaseContainer):
+    # Not slotted: the subtype of every instance is set when exported
     type = "structural_elements"
 
-    def export(self, exm):
+    def fragments(self, exm):
         self.subtype = "se_"+self[0].content[0]
-        return super().export(exm)
+        return super().fragments(exm)
 
 
 class HeaderContainer(BaseContainer):
+    __slots__ = ()
     type = "structural_elements"
     subtype = "header"
 
-    def export(self, exm):
+    def fragments(self, exm):
         self.others = {} # noqa F821
         self.others["header_level"] = len(self.content[0].content[0])
-        return super().export(exm)
+        return super().fragments(exm)
 
-    def get_content(self, exm, arbitrary_list=None):
-        return self.content[0].content[1]
+    def content_fragments(self, exm, arbitrary_list=None):
+        return [self.content[0].content[1]]
 
 
 class DisplayContainer(BaseContainer):
+    __slots__ = ()
     type = "structural_elements"
     subtype = "display"
 
-    def export(self, exm):
+    def fragments(self, exm):
         # self.others = {}
         self.others["display_level"] = len(self.content[0].content[0])
-        return super().export(exm)
+        return super().fragments(exm)
 
-    def get_content(self, exm, arbitrary_list=None):
-        return self.content[0].content[1]
+    def content_fragments(self, exm, arbitrary_list=None):
+        return [self.content[0].content[1]]
 
 
 class TableSeparatorContainer(BaseContainer):
-    pass
+    __slots__ = ()
 
 
 # class TableHeadContainer(BaseContainer):
@@ -380,30 +482,26 @@ class TableSeparatorContainer(BaseContainer):
 
 
 class TableRowContainer(BaseContainer):
+    __slots__ = ()
     type = "table"
     subtype = "t_row"
-
-    def __init__(self, content=None, optionals=None, others=None):
-        super().__init__(content, optionals, others)
-        self.map['colspan'] = ""
-    pass
+    default_map = MappingProxyType({'colspan': ""})
 
 
 class TableCellContainer(BaseContainer):
+    __slots__ = ()
     type = "table"
     subtype = "t_cell"
-
-    def __init__(self, content=None, optionals=None, others=None):
-        super().__init__(content, optionals, others)
-        self.map['colspan'] = ""
-    pass
+    default_map = MappingProxyType({'colspan': ""})
 
 
 class LinebreakContainer(BaseContainer):
-    def export(self, _):
+    __slots__ = ()
+
+    def fragments(self, _):
         if len(self.content) == 1:
-            return "\n"
-        return "<br />\n"*(len(self.content)-1)
+            return ["\n"]
+        return ["<br />\n"*(len(self.content)-1)]
 
 
 """
@@ -446,9 +544,10 @@ class ContextManager:
         self.output = []
         self.parsed_list = parsed_list
         self.pile = []
-        self.name = name
+        self.name = sys.intern(name) if isinstance(name, str) else name  # Shared by every token of the page
         self.ident = ident
         self.matched_elements = {}
+        self._skips = None  # (before, after): jumps over the empty slots of the pile while it's built, see _previous_slot
         self.dict_lookahead = {
             "list:ulist": ["list:ulist"],
             "list:olist": ["list:olist"],
@@ -458,6 +557,38 @@ class ContextManager:
         }
         self.contextualised = False
 
+    def _previous_slot(self, index):
+        """
+        Returns the index of the last slot of the pile at or before index that isn't None, or -1.
+        While __call__ builds the pile, slots are only ever emptied: the empty slots walked through are remembered,
+        and the jumps followed are shortened, so that they are only walked through once.
+        :type index: int
+        :rtype: int
+        """
+        before = self._skips[0] if self._skips else {}
+        path = []
+        while index >= 0 and self.pile[index] is None:
+            path.append(index)
+            index = before.get(index, index - 1)
+        for i in path:
+            before[i] = index
+        return index
+
+    def _next_slot(self, index):
+        """
+        Returns the index of the first slot of the pile at or after index that isn't None, or the length of the pile.
+        :type index: int
+        :rtype: int
+        """
+        after = self._skips[1] if self._skips else {}
+        path = []
+        while index < len(self.pile) and self.pile[index] is None:
+            path.append(index)
+            index = after.get(index, index + 1)
+        for i in path:
+            after[i] = index
+        return index
+
     def encapsulate(self, start, end):
         """
         Method to encapsulate a number of tokens together as a final container object
@@ -501,11 +632,13 @@ class ContextManager:
                 )
             else:
                 raise error
-        for i in range(start, end):
+        i = self._next_slot(start)
+        while i < end:
             if self.pile[i]:
                 # This line transform the self modifiying containers # MONITOR
                 container.add(self.pile[i].to_container(lambda x: x.label == pile_start.label)) # noqa : F821
                 self.pile[i] = None
+            i = self._next_slot(i + 1)
         container.add(self.pile[end])
         self.pile[end] = None
         self.pile[start] = container
@@ -548,55 +681,59 @@ class ContextManager:
 
         index, line_number = 0,  1
 
-        while index < len(self.parsed_list):
-            token = self.parsed_list[index]
-            token.line_number = line_number
-            token.index = index
-            token.file_name = self.name
-            token.ident = self.ident
-            self.pile.append(token)
-            try:
-                # Linebreaks
-                if isinstance(token, syntax.Linebreak):
-                    # self.encapsulate(index, index)
-                    line_number += 1
-
-                # Pack the optionnal with the previous container if it exists (else raise error)
-                if isinstance(token, syntax.OptionalToken):
-                    self.get_last_container_in_pile(index).optionals = token
-                    self.pile[index] = None
-
-                # Group together multiple one-lines
-                elif token.label in self.dict_lookahead:
-                    lookahead_return = self.lookahead(token, index)
-                    index += lookahead_return[0]
-                    line_number += lookahead_return[1]
-
-                # future: advanced lookahead for * logic
-                # elif token.label in self.dict_advanced_lookahead:
-
-                elif isinstance(token, syntax.FinalSemanticType):  # one-liners
-                    self.encapsulate(index, index)
-
-                # Found a matching token in encountered tokens
-                elif token.counterpart() in self.matched_elements and len(self.matched_elements[token.counterpart()]) != 0:
-                    self.encapsulate(self._get_matched(token.counterpart()), index)
-
-                # Error if closing token does not have a start
-                elif isinstance(token, syntax.ClosedSemanticType):
-                    raise MismatchedContainerError(token, self.parsed_list)
-
-                # Starting token by default (can cause unintended behaviours on bad implementations)
-                elif isinstance(token, syntax.TokensToMatch):
-                    self._add_matched(token.label, index)
+        self._skips = ({}, {})
+        try:
+            while index < len(self.parsed_list):
+                token = self.parsed_list[index]
+                token.line_number = line_number
+                token.index = index
+                token.file_name = self.name
+                token.ident = self.ident
+                self.pile.append(token)
+                try:
+                    # Linebreaks
+                    if isinstance(token, syntax.Linebreak):
+                        # self.encapsulate(index, index)
+                        line_number += 1
+
+                    # Pack the optionnal with the previous container if it exists (else raise error)
+                    if isinstance(token, syntax.OptionalToken):
+                        self.get_last_container_in_pile(index).optionals = token
+                        self.pile[index] = None
+
+                    # Group together multiple one-lines
+                    elif token.label in self.dict_lookahead:
+                        lookahead_return = self.lookahead(token, index)
+                        index += lookahead_return[0]
+                        line_number += lookahead_return[1]
+
+                    # future: advanced lookahead for * logic
+                    # elif token.label in self.dict_advanced_lookahead:
+
+                    elif isinstance(token, syntax.FinalSemanticType):  # one-liners
+                        self.encapsulate(index, index)
+
+                    # Found a matching token in encountered tokens
+                    elif token.counterpart() in self.matched_elements and len(self.matched_elements[token.counterpart()]) != 0:
+                        self.encapsulate(self._get_matched(token.counterpart()), index)
+
+                    # Error if closing token does not have a start
+                    elif isinstance(token, syntax.ClosedSemanticType):
+                        raise MismatchedContainerError(token, self.parsed_list)
+
+                    # Starting token by default (can cause unintended behaviours on bad implementations)
+                    elif isinstance(token, syntax.TokensToMatch):
+                        self._add_matched(token.label, index)
 
-                else:
-                    raise MismatchedContainerError(token, self.parsed_list)
+                    else:
+                        raise MismatchedContainerError(token, self.parsed_list)
 
-            except MismatchedContainerError as e:
-                error_mngr.log_message(f"In context: {e.get_context()}", level="CRITICAL")
-                error_mngr.log_exception(e, level="CRITICAL")  # FUTURE: Try to guess some hints.
-            index += 1
+                except MismatchedContainerError as e:
+                    error_mngr.log_message(f"In context: {e.get_context()}", level="CRITICAL")
+                    error_mngr.log_exception(e, level="CRITICAL")  # FUTURE: Try to guess some hints.
+                index += 1
+        finally:
+            self._skips = None
 
         self.contextualised = True
         return self.finalize_pile()
@@ -691,14 +828,14 @@ class ContextManager:
         :rtype: BaseContainer
         :raise: error_mngr.LonelyOptionalError when an element is found in the pile that is not encapsulated in a container.
         """
-        i = index-1  # skip last token as it is self
+        i = self._previous_slot(index-1)  # skip last token as it is self
         while i >= 0:
             if self.pile[i]:
                 if isinstance(self.pile[i], BaseContainer):
                     return self.pile[i]
                 else:
                     log_exception(LonelyOptionalError(self.pile[index], self.pile[i]), level="CRITICAL")
-            i -= 1
+            i = self._previous_slot(i - 1)
         log_exception(LonelyOptionalError(self.pile[index], None), level="CRITICAL")
 
     def print_all(self):
@@ -47,7 +47,13 @@ class Environment:
 
         # secondaryParameters
         self._sParams = {
-
+            'parse_cache': None,
+            'profile_stages': False,
+            'profile_pages': None,
+            'memory_report': False,
+            'token_stream_size': None,
+            'source_cache': None,
+            'alias_table': None,
         }
 
         # Set all parameters to uninitialised
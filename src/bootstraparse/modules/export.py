@@ -6,10 +6,14 @@ Usage:
  - rsp = ExportResponse("start_string", "end_string")
  - em = ExportManager(config_file, template_file)
  - em(ExportRequest()) -> ExportResponse()
+ - render = compile_template("<h{header_level}{optionals}>") ; render(header_level=1, optionals="") -> "<h1>"
+The templates are compiled once, when the ExportManager is created, and the required ones are checked at that time.
+Identical requests are answered from em.responses (an LRUCache keyed by request_key(), counting its hits and misses).
 """
 
+import string
 from io import StringIO
-from bootstraparse.modules import config, pathresolver, error_mngr, context_mngr
+from bootstraparse.modules import config, pathresolver, error_mngr, context_mngr, cache
 from collections import namedtuple
 from bootstraparse.modules import tools
 
@@ -27,6 +31,102 @@ final output.
 """
 ExportResponse = namedtuple("ExportResponse", ["start", "end"])
 
+"""
+Named tuple containing the raw start and end strings of a template, and the functions formatting them.
+"""
+CompiledTemplate = namedtuple("CompiledTemplate", ["start", "end", "render_start", "render_end"])
+
+# Templates requested by the containers (and by the preparser for images), a missing one is an error at load time
+REQUIRED_TEMPLATES = (
+    ("structural_elements", "se_div"), ("structural_elements", "se_article"), ("structural_elements", "se_aside"),
+    ("structural_elements", "se_section"), ("structural_elements", "se_nav"), ("structural_elements", "se_header"),
+    ("structural_elements", "se_body"), ("structural_elements", "header"), ("structural_elements", "display"),
+    ("inline_elements", "link"), ("inline_elements", "em"), ("inline_elements", "strong"),
+    ("inline_elements", "underline"), ("inline_elements", "strikethrough"), ("inline_elements", "image"),
+    ("oneline_elements", "ulist"), ("oneline_elements", "olist"), ("oneline_elements", "list_line"),
+    ("table", "t_row"), ("table", "t_cell"),
+)
+
+
+def compile_template(template):
+    """
+    Compiles a template string into a function returning the same string as template.format(**values),
+    the string is only parsed once.
+    :param template: The template string.
+    :type template: str
+    :return: The function formatting the template.
+    :rtype: callable
+    """
+    literals, names = [], []
+    for literal, name, format_spec, conversion in string.Formatter().parse(template):
+        if name is not None and (format_spec or conversion or not name.isidentifier()):
+            return template.format  # Positional fields, attributes, conversions... are left to str.format
+        literals.append(literal)
+        names.append(name)
+
+    if not any(names):
+        constant = "".join(literals)
+        return lambda **values: constant
+    if len(names) == 1 or (len(names) == 2 and names[1] is None):
+        prefix, name, suffix = literals[0], names[0], "".join(literals[1:])
+        return lambda **values: prefix + format(values[name]) + suffix
+    pieces = list(zip(literals, names))
+    return lambda **values: "".join([
+        literal + format(values[name]) if name is not None else literal for literal, name in pieces
+    ])
+
+
+def freeze(value):
+    """
+    Returns a hashable equivalent of a value made of dicts, lists and tuples.
+    Every value is paired with the name of its type, so that equal values of different types (1, 1.0 and True,
+    or a dict and the list of its items) get different keys.
+    :param value: The value to freeze.
+    :return: The same value, with dicts turned into tuples of items sorted by key type and repr, lists into tuples.
+    :rtype: collections.abc.Hashable
+    """
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: (type(item[0]).__name__, repr(item[0])))
+        return "dict", tuple((freeze(key), freeze(item)) for key, item in items)
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(freeze(item) for item in value)
+    return type(value).__name__, value
+
+
+# Key of the split optionals of a request without optionals
+NO_OPTIONALS = ("", "", freeze([]), freeze({}))
+
+
+def optionals_key(optionals):
+    """
+    Returns a canonical key of optionals: optionals with the same key split into the same values.
+    :param optionals: The optionals, or None.
+    :type optionals: syntax.OptionalToken | None
+    :rtype: tuple
+    """
+    if not optionals:
+        return NO_OPTIONALS
+    split = syntax.split_optionals(optionals)
+    return split.html_insert, split.class_insert, freeze(split.var_list), freeze(split.var_dict)
+
+
+def request_key(export_request):
+    """
+    Returns a canonical, hashable key of an ExportRequest: two requests with the same key get the same response.
+    Requests without optionals or others, most of those made while rendering, are neither split nor frozen.
+    :param export_request: ExportRequest tuples
+    :type export_request: ExportRequest
+    :return: The key, or None if the request contains a value that can't be hashed.
+    :rtype: tuple | None
+    """
+    key = (export_request.type, export_request.subtype, optionals_key(export_request.optionals),
+           freeze(export_request.others) if export_request.others else ())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 
 def format_optionals(optionals):
     """
@@ -58,6 +158,8 @@ class ExportManager:
         """
         self.config = cnoifg
         self.templates = templates
+        self.compiled_templates = self.compile_templates()
+        self.responses = cache.LRUCache(max_size=self.config["parser_config"]["export"]["response_cache_size"])
         self.advanced_export = {
             "header": self.header_transform,
             "display": self.display_transform,
@@ -75,7 +177,14 @@ class ExportManager:
         :type export_request: ExportRequest
         :return: ExportResponse tuples
         """
-        return self.transform(export_request)
+        key = request_key(export_request)
+        if key is None:
+            return self.transform(export_request)
+        response = self.responses.get(key)
+        if response is None:
+            response = self.transform(export_request)
+            self.responses.put(key, response)
+        return response
 
     def transform(self, export_request):
         """
@@ -92,33 +201,53 @@ class ExportManager:
         else:
             return self.basic_transform(export_request)
 
+    def compile_templates(self):
+        """
+        Compiles every template of the "bootstrap" templates, and checks that the required ones are there.
+        :return: The compiled templates, keyed by (type, subtype).
+        :rtype: dict[(str, str), CompiledTemplate]
+        """
+        compiled = {}
+        for export_type, subtypes in self.templates["bootstrap"].items():
+            for subtype, (start, end) in subtypes.items():
+                compiled[(export_type, subtype)] = CompiledTemplate(start, end, compile_template(start),
+                                                                    compile_template(end))
+        for export_type, subtype in REQUIRED_TEMPLATES:
+            if (export_type, subtype) not in compiled:
+                self.log_missing_template(export_type, subtype)
+        return compiled
+
+    def log_missing_template(self, export_type, subtype):
+        """
+        Raises the error of a template that could not be found, with the part of its path that was found.
+        :type export_type: str
+        :type subtype: str
+        """
+        log_entries = ["bootstrap", export_type, subtype]
+        log_ = tools.dict_check(self.templates, *log_entries)
+        error_mngr.log_exception(
+            KeyError(
+                f'Template "bootstrap"/{export_type}/{subtype} could not be found.\n' +
+                '\n'.join([f'{i}: {"Found" if j else "Not found"}' for i, j in zip(log_entries, log_)])
+            ),
+            level='CRITICAL'
+        )
+
     def _get_template(self, export_request):
         """
         Function for initializing other transform functions.
-
         :param export_request: ExportRequest tuples
         :type export_request: ExportRequest
-        :return: start, end, optionals
-        :rtype: str, str, str
+        :return: the compiled template, optionals
+        :rtype: CompiledTemplate, str
         """
-
-        start, end = None, None
-        try:
-            start, end = self.templates["bootstrap"][export_request.type][export_request.subtype]
-        except KeyError:
-            log_entries = ["bootstrap", export_request.type, export_request.subtype]
-            log_ = tools.dict_check(self.templates, *log_entries)
-            error_mngr.log_exception(
-                KeyError(
-                    f'Template "bootstrap"/{export_request.type}/{export_request.subtype} could not be found.\n' +
-                    '\n'.join([f'{i}: {"Found" if j else "Not found"}' for i, j in zip(log_entries, log_)])
-                ),
-                level='CRITICAL'
-            )
+        template = self.compiled_templates.get((export_request.type, export_request.subtype))
+        if template is None:
+            self.log_missing_template(export_request.type, export_request.subtype)
         # future: allow for template selection
         optionals = format_optionals(export_request.optionals)
 
-        return start, end, optionals
+        return template, optionals
 
     def basic_transform(self, export_request):
         """
@@ -128,9 +257,8 @@ class ExportManager:
         :return: ExportResponse tuples
         :rtype: ExportResponse
         """
-        start, end, optionals = self._get_template(export_request)
-        start = start.format(optionals=optionals)
-        return ExportResponse(start, end)
+        template, optionals = self._get_template(export_request)
+        return ExportResponse(template.render_start(optionals=optionals), template.end)
 
     def header_transform(self, export_request):
         """
@@ -138,10 +266,10 @@ class ExportManager:
         :type export_request: ExportRequest
         :rtype: ExportResponse
         """
-        start, end, optionals = self._get_template(export_request)
+        template, optionals = self._get_template(export_request)
         try:
-            start = start.format(optionals=optionals, header_level=export_request.others["header_level"])
-            end = end.format(header_level=export_request.others["header_level"])
+            start = template.render_start(optionals=optionals, header_level=export_request.others["header_level"])
+            end = template.render_end(header_level=export_request.others["header_level"])
         except KeyError:
             error_mngr.log_exception(
                 KeyError(
@@ -158,9 +286,9 @@ class ExportManager:
         :type export_request: ExportRequest
         :rtype: ExportResponse
         """
-        start, end, optionals = self._get_template(export_request)
-        start = start.format(optionals=optionals, display_level=export_request.others["display_level"])
-        return ExportResponse(start, end)
+        template, optionals = self._get_template(export_request)
+        start = template.render_start(optionals=optionals, display_level=export_request.others["display_level"])
+        return ExportResponse(start, template.end)
 
     def link_transform(self, export_request):
         """
@@ -168,9 +296,8 @@ class ExportManager:
         :type export_request: ExportRequest
         :rtype: ExportResponse
         """
-        start, end, _ = self._get_template(export_request)
-        start = start.format(url=export_request.others["url"])
-        return ExportResponse(start, end)
+        template, _ = self._get_template(export_request)
+        return ExportResponse(template.render_start(url=export_request.others["url"]), template.end)
 
     def t_transform(self, export_request):
         """
@@ -178,9 +305,8 @@ class ExportManager:
         :type export_request: ExportRequest
         :rtype: ExportResponse
         """
-        start, end, _ = self._get_template(export_request)
-        start = start.format(col_span=export_request.others["col_span"])
-        return ExportResponse(start, end)
+        template, _ = self._get_template(export_request)
+        return ExportResponse(template.render_start(col_span=export_request.others["col_span"]), template.end)
 
     def image_transform(self, export_request):
         """
@@ -188,16 +314,15 @@ class ExportManager:
         :type export_request: ExportRequest
         :rtype: ExportResponse
         """
-        start, end, optionals = self._get_template(export_request)
-        end = end.format(optionals=optionals)
-        return ExportResponse(start, end)
+        template, optionals = self._get_template(export_request)
+        return ExportResponse(template.start, template.render_end(optionals=optionals))
 
 
 class ContextConverter:
     """
     Transforms output form context manager into final, printable versions of the containers.
     """
-    def __init__(self, pile, exporter, destination):
+    def __init__(self, pile, exporter, destination, sink=None):
         """
         Takes a pile and the exporter object
         :type pile : list[context_mngr.BaseContainer]
@@ -206,8 +331,11 @@ class ContextConverter:
         :param exporter: Our ExportManager
         :type destination : str
         :param destination: Destination of the output file.
+        :type sink : io.TextIOBase
+        :param sink: Writable object the output is written to (usually the open output file), a StringIO by default.
         """
-        self.io_output = StringIO()
+        self.io_output = StringIO() if sink is None else sink
+        self.owns_io = sink is None
         self.pile = pile
         self.exporter = exporter
         self.io_initialized = False
@@ -215,13 +343,15 @@ class ContextConverter:
 
     def process_pile(self):
         """
-        Processes the pile and writes the output to the io_output object.
-        :rtype: StringIO
+        Processes the pile and writes every fragment of the output to the io_output object as soon as it is exported,
+        the output of a container is never held in memory as a whole.
+        The default StringIO is rewound so that it can be read, a sink given by the caller is left as is.
+        :rtype: StringIO | io.TextIOBase
         """
-        for container in self.pile:
-            self.io_output.write(container.export(self.exporter))
+        context_mngr.render(self.pile, self.exporter, self.io_output.write)
         self.io_initialized = True
-        self.io_output.seek(0)
+        if self.owns_io:
+            self.io_output.seek(0)
 
         return self.io_output
 
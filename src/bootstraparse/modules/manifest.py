@@ -0,0 +1,214 @@
+"""
+Module keeping track of what was built, so that only what changed is rebuilt.
+The manifest is saved in the destination folder, for each output page it records the hash of its source,
+of every file in its import closure, and of the configs and templates used to build it.
+Usage:
+ - from bootstraparse.modules.manifest import BuildManifest
+ - manifest = BuildManifest(destination, env)
+ - manifest = BuildManifest(destination, env, changed={path, ...}) # when the changed files are already known
+ - manifest.needs_build(source, destination_file) -> False if the page can be skipped
+ - manifest.needs_copy(source, destination_file) -> False if the file can be skipped
+ - manifest.record_page(source, destination_file, dependencies) # after a successful build
+ - manifest.remove_stale() # deletes the outputs whose sources are gone
+ - manifest.save()
+"""
+
+import hashlib
+import json
+import os
+
+from bootstraparse.modules import error_mngr, environment  # noqa F401
+
+# Folder of the destination where bootstraparse keeps its own files
+METADATA_FOLDER = ".bootstraparse"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_file(path):
+    """
+    Returns the sha256 hash of the content of a file.
+    :param path: The path of the file.
+    :type path: str
+    :return: The hexadecimal hash, or None if the file doesn't exist.
+    :rtype: str | None
+    """
+    sha = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                sha.update(chunk)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return sha.hexdigest()
+
+
+def hash_environment(_env):
+    """
+    Returns a hash of all the config and template files loaded in the environment.
+    :param _env: The environment object.
+    :type _env: environment.Environment
+    :return: The hexadecimal hash.
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    for loader in (_env.config, _env.template):
+        for folder in loader.config_folders:
+            for filename in sorted(os.listdir(folder)):
+                if os.path.splitext(filename)[1][1:] in loader.extensions:
+                    path = os.path.join(folder, filename)
+                    sha.update(f"{path}:{hash_file(path)};".encode())
+    return sha.hexdigest()
+
+
+class BuildManifest:
+    """
+    Fingerprints of the pages and files of the previous build, read from and saved to the destination folder.
+    """
+    def __init__(self, destination, _env, full_rebuild=False, changed=None):
+        """
+        Loads the manifest of the previous build, if any.
+        :param destination: The destination path of the built website.
+        :param _env: The environment object.
+        :param full_rebuild: If True, every page and file is considered as changed.
+        :param changed: If given, the absolute paths of the only files that changed, no file is hashed to find them.
+        :type destination: str
+        :type _env: environment.Environment
+        :type full_rebuild: bool
+        :type changed: set[str] | None
+        """
+        self.destination = destination
+        self.changed = changed
+        self.path = os.path.join(destination, METADATA_FOLDER, MANIFEST_NAME)
+        self.full_rebuild = full_rebuild
+        self.environment_hash = hash_environment(_env)
+        self.pages = {}
+        self.assets = {}
+        self.seen = set()
+        self._hashes = {}
+        self.load()
+
+    def load(self):
+        """
+        Reads the manifest file, an unreadable or outdated manifest is ignored.
+        """
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            if saved["version"] == MANIFEST_VERSION:
+                self.pages = saved["pages"]
+                self.assets = saved["assets"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            error_mngr.log_message(f"Ignoring the unreadable build manifest {self.path}.", level="WARNING")
+
+    def save(self):
+        """
+        Writes the manifest file, the previous one is replaced atomically.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "pages": self.pages, "assets": self.assets}, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def key(self, destination):
+        """
+        Returns the key of an output file in the manifest (its path relative to the destination).
+        :type destination: str
+        :rtype: str
+        """
+        return os.path.relpath(destination, self.destination)
+
+    def hash(self, path):
+        """
+        Returns the hash of a file, every file is hashed only once per build.
+        :type path: str
+        :rtype: str | None
+        """
+        path = os.path.abspath(path)
+        if path not in self._hashes:
+            self._hashes[path] = hash_file(path)
+        return self._hashes[path]
+
+    def needs_build(self, source, destination):
+        """
+        Checks whether a page must be rebuilt, and marks it as part of the current site.
+        A page is up-to-date if its output exists and neither its source, its imports, nor the configs changed.
+        :param source: The path of the .bpr file.
+        :param destination: The path of the html file.
+        :type source: str
+        :type destination: str
+        :rtype: bool
+        """
+        key = self.key(destination)
+        self.seen.add(key)
+        entry = self.pages.get(key)
+        if self.full_rebuild or entry is None or not os.path.exists(destination):
+            return True
+        if entry["environment"] != self.environment_hash or entry["source"] != os.path.abspath(source):
+            return True
+        if self.changed is not None:
+            return any(path in self.changed for path in entry["dependencies"])
+        for path, digest in entry["dependencies"].items():
+            if self.hash(path) != digest:
+                return True
+        return False
+
+    def needs_copy(self, source, destination):
+        """
+        Checks whether a file must be copied again, and marks it as part of the current site.
+        Files are compared on their size and modification time, to avoid reading them.
+        :param source: The path of the original file.
+        :param destination: The path of the copy.
+        :type source: str
+        :type destination: str
+        :rtype: bool
+        """
+        key = self.key(destination)
+        self.seen.add(key)
+        stat = os.stat(source)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        up_to_date = not self.full_rebuild and self.assets.get(key) == signature and os.path.exists(destination)
+        self.assets[key] = signature
+        return not up_to_date
+
+    def record_page(self, source, destination, dependencies):
+        """
+        Records the fingerprint of a page that was just built.
+        :param source: The path of the .bpr file.
+        :param destination: The path of the html file.
+        :param dependencies: The paths of the source and of every file it imports.
+        :type source: str
+        :type destination: str
+        :type dependencies: list[str]
+        """
+        self.pages[self.key(destination)] = {
+            "source": os.path.abspath(source),
+            "environment": self.environment_hash,
+            "dependencies": {os.path.abspath(path): self.hash(path) for path in dependencies},
+        }
+
+    def forget(self, destination):
+        """
+        Removes a page from the manifest, so that it is rebuilt next time (used when its build failed).
+        :type destination: str
+        """
+        self.pages.pop(self.key(destination), None)
+        self.assets.pop(self.key(destination), None)
+
+    def remove_stale(self):
+        """
+        Deletes the outputs of the previous build whose sources are gone.
+        :return: The list of deleted files.
+        :rtype: list[str]
+        """
+        removed = []
+        for entries in (self.pages, self.assets):
+            for key in [k for k in entries if k not in self.seen]:
+                del entries[key]
+                path = os.path.join(self.destination, key)
+                if os.path.isfile(path):
+                    os.remove(path)
+                    removed.append(path)
+        return removed
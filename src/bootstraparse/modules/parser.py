@@ -4,25 +4,88 @@ parse_line takes a io and outputs it all as a list of parsed elements
 Usage:
  - from bootstraparse.modules.parser import parse_line
  - parse_line(io) -> [element, element, element]
+ - iter_tokens(io) -> same elements, read and parsed lazily one line at a time
+ - parse_line(io, cache) -> same, but the tokens are read from / stored in a cache.ParseCache
+ - parse_stream(io) -> same elements, as a compact tokenstream.TokenStream (for large documents)
+ - line_memo.hit_rate -> proportion of the lines that were not parsed again
+Lines repeat a lot across a website (blank lines, closing tags, navigation...), so the tokens of every line parsed
+are kept in line_memo. They are stored pickled, since the context manager mutates the tokens it is given.
 """
+import pickle
 from io import StringIO
 
 import bootstraparse.modules.syntax as syntax
+from bootstraparse.modules.cache import LRUCache
+from bootstraparse.modules.tokenstream import TokenStream
 
+# Pickled tokens of the most recently parsed lines, keyed by the raw line
+line_memo = LRUCache(max_size=4096)
 
-def parse_line(io):
+
+def parse_line(io, cache=None):
     """
     Takes an io string and returns the parsed output.
     :param io: The io string to parse.
+    :param cache: If given, the cache the output is read from, or stored in if the text wasn't parsed before.
     :type io: StringIO
+    :type cache: bootstraparse.modules.cache.ParseCache
     :return: The parsed output.
     :rtype: list[syntax.SemanticType]
     """
-    output = []
-    for line in io.readlines():
-        output += syntax.line.parseString(line).asList() + [syntax.Linebreak('')]
+    if cache is not None:
+        text = io.read()
+        output = cache.get(text)
+        if output is None:
+            output = parse_line(StringIO(text))
+            cache.put(text, output)
+        return output
+
+    return list(iter_tokens(io))
+
+
+def iter_tokens(io):
+    """
+    Reads an io string line by line, and yields the tokens of each line followed by a Linebreak.
+    :param io: The io string to parse.
+    :type io: StringIO
+    :return: The parsed elements, one at a time.
+    :rtype: collections.abc.Iterator[syntax.SemanticType]
+    """
+    for line in io:
+        yield from line_tokens(line)
+
+
+def line_tokens(line):
+    """
+    Returns the tokens of a line followed by a Linebreak, new tokens are returned for every call.
+    :param line: The line to parse.
+    :type line: str
+    :rtype: list[syntax.SemanticType]
+    """
+    tokens = line_memo.get(line)
+    if tokens is None:
+        tokens = pickle.dumps(syntax.parse_routed(line) + [syntax.Linebreak('')])
+        line_memo.put(line, tokens)
+    return pickle.loads(tokens)
+
 
-    return output
+def parse_stream(io):
+    """
+    Takes an io string and returns the parsed output as a TokenStream, only one line of tokens is created at a time.
+    The lines are sliced from the text the stream keeps, one at a time, the text is not copied.
+    :param io: The io string to parse.
+    :type io: StringIO
+    :rtype: TokenStream
+    """
+    text = io.read()
+    stream = TokenStream(text)
+    line_start = 0
+    while line_start < len(text):
+        line_end = text.find("\n", line_start) + 1 or len(text)
+        line = text[line_start:line_end]
+        stream.add_line(line_start, line, line_tokens(line))
+        line_start = line_end
+    return stream
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -5,11 +5,18 @@ Usage:
  - pp.do_import() # imports all the modules and adds them to the file, do the same for all the files that are to be imported - # noqa
  - pp.do_replacements() # replaces all images and shortcuts in the file
  - pp.readlines() # returns the lines of ORIGINAL file
+ - pp.source_lines() # returns the lines of ORIGINAL file, shared through the source cache of the environment
  - pp.get_all_lines() # returns the lines of the file after replacements and imports
+ - pp.expand() # returns the text of the file with all its imports done, shared through the source cache
+ - pp.get_import_closure() # returns the paths of all the files imported, directly or not
+The aliases and images of the config are flattened once into an AliasTable, which memoizes their rendered html:
+ - table = AliasTable(config, export_manager)
+ - table.render('shortcuts' | 'images', name, optionals) -> html, or None if the name is not in the config
 """
 
 
 import os
+import re
 from io import StringIO
 
 from bootstraparse.modules import pathresolver as pr
@@ -17,12 +24,82 @@ from bootstraparse.modules import environment
 from bootstraparse.modules import syntax
 from bootstraparse.modules import error_mngr
 from bootstraparse.modules import export
+from bootstraparse.modules import cache
 
 import rich
+from pyparsing import ParseException
 from rich.tree import Tree
 
 # list of regexps
 _rgx_import_file = syntax.rgx_import_file
+# The replacement engine finds the lines to replace with _rgx_marker, then emulates syntax.line_to_replace on them:
+# an image is replaced first if the rest of the line has one, otherwise an alias; the text after the last one is dropped.
+# Like pyparsing, it expands the tabs of every line.
+_rgx_marker = re.compile(r"@[{[]")
+_rgx_image = re.compile(r"@\{[ \t\r\n]*([^}]*)\}")
+_rgx_alias = re.compile(r"@\[[ \t\r\n]*([^\]]*)\]")
+_rgx_whitespace = re.compile(r"[ \t\r\n]*")  # Skipped before the text preceding a replacement, like pyparsing does
+# The brackets that may hold optionals, only they are given to pyparsing (the parsed optionals are memoized)
+_rgx_optionals = re.compile(r"(?:[ \t\r\n]*(?:\{\{[^}]*\}\}|\{[^}]*\}|\[[^\]]*\]))+")
+_optionals_memo = cache.LRUCache(max_size=1024)
+
+
+class AliasTable:
+    """
+    The aliases.shortcuts and aliases.images sections of the config, flattened once,
+    with the html rendered for every (section, name, optionals) memoized.
+    """
+    def __init__(self, _config, export_mngr, memo_size=4096):
+        """
+        :param _config: the config loader holding the aliases
+        :param export_mngr: the export manager rendering the images
+        :param memo_size: the number of rendered aliases and images kept
+        :type _config: bootstraparse.modules.config.ConfigLoader
+        :type export_mngr: export.ExportManager
+        :type memo_size: int
+        """
+        self.export_mngr = export_mngr
+        aliases = _config.loaded_conf.get('aliases') or {}
+        self.table = {(section, name): value
+                      for section in ('shortcuts', 'images')
+                      for name, value in (aliases.get(section) or {}).items()}
+        self.rendered = cache.LRUCache(max_size=memo_size)
+
+    def render(self, section, name, optionals):
+        """
+        Returns the html of an alias or an image, rendered only once for the same optionals.
+        :param section: 'shortcuts' for an alias, 'images' for an image
+        :param name: the id of the alias or image
+        :param optionals: the optionals given with it
+        :type section: str
+        :type name: str
+        :type optionals: syntax.OptionalToken | None
+        :return: the html, or None if the name is not in the section
+        :rtype: str | None
+        """
+        if (section, name) not in self.table:
+            return None
+        key = (section, name, export.optionals_key(optionals))
+        html = self.rendered.get(key)
+        if html is None:
+            html = self.render_now(section, name, optionals)
+            self.rendered.put(key, html)
+        return html
+
+    def render_now(self, section, name, optionals):
+        """
+        Renders an alias or an image, the name must be in the section.
+        :type section: str
+        :type name: str
+        :type optionals: syntax.OptionalToken | None
+        :rtype: str
+        """
+        _, _, var_list, var_dict = syntax.split_optionals(optionals)
+        html = PreParser.make_replacements(self.table[section, name], *var_list, **var_dict)
+        if section == 'images':
+            output = self.export_mngr(export.ExportRequest('inline_elements', 'image', optionals))
+            html = output.start + html + output.end
+        return html
 
 
 class PreParser:
@@ -59,6 +136,7 @@ class PreParser:
         self.global_dict_of_imports = dict_of_imports
         self.local_dict_of_imports = {}  # Dictionary of all local imports made to avoid duplicate file opening ?
         self.saved_import_list = None
+        self.expanded_text = None  # The text with all imports done, if imported and there is no source cache
 
         # The tree view of the import tree (if saved)
         self.tree_view = None
@@ -121,8 +199,18 @@ class PreParser:
         :return: a list of lines
         :rtype: list[str]
         """
-        with open(self.relative_path_resolver(self.name), 'r') as f:
-            return f.readlines()
+        return list(self.source_lines())
+
+    def source_lines(self):
+        """
+        Returns the lines of the original file, read only once per build if the environment has a source cache.
+        :return: the lines, they must not be modified
+        :rtype: tuple[str]
+        """
+        path = self.relative_path_resolver(self.name)
+        if self._env.source_cache is not None:
+            return self._env.source_cache.lines(path)
+        return cache.read_lines(path)
 
     def get_all_lines(self):
         """
@@ -167,6 +255,21 @@ class PreParser:
         self.is_global_dict_of_imports_initialized = True
         return self.local_dict_of_imports
 
+    def get_import_closure(self):
+        """
+        Returns the paths of every file imported by this file, directly or through other imports.
+        :return: the sorted list of absolute paths
+        :rtype: list[str]
+        """
+        closure = set()
+        to_visit = [self]
+        while to_visit:
+            for path, pp in to_visit.pop().make_import_list().items():
+                if path not in closure:
+                    closure.add(path)
+                    to_visit.append(pp)
+        return sorted(closure)
+
     def parse_import_list(self):
         """
         Parses the import list of the file.
@@ -177,13 +280,23 @@ class PreParser:
             return self.saved_import_list
         import_list = []
         line_count = 0
-
-        for line in self.readlines():
-            results = _rgx_import_file.searchString(line)
+        counted = 0  # Position up to which the line breaks are counted in line_count
+
+        # Only the lines containing a "::" can hold an import, they are found with a plain search of the whole text
+        text = "".join(self.source_lines())
+        candidate = text.find("::")
+        while candidate >= 0:
+            line_count += text.count("\n", counted, candidate)
+            counted = candidate
+            line_start = text.rfind("\n", 0, candidate) + 1
+            line_end = text.find("\n", candidate) + 1
+            if line_end == 0:
+                line_end = len(text)
+            results = _rgx_import_file.searchString(text[line_start:line_end])
             if results:
                 for e in results[0]:
                     import_list += [(e.rstrip(), line_count)]
-            line_count += 1
+            candidate = text.find("::", line_end)
         # converts relative paths to absolute and returns a table
         self.saved_import_list = [(self.relative_path_resolver(p), l) for p, l in import_list]
         return self.saved_import_list
@@ -195,33 +308,46 @@ class PreParser:
         :rtype: StringIO
         """
         self.make_import_list()
+        if not self.imports_done:
+            self.file_with_all_imports.write(self.expand())
+            self.imports_done = True
+        self.file_with_all_imports.seek(0)
+        self.current_origin_for_read = self.file_with_all_imports
+        return self.current_origin_for_read
 
-        # If the imports are already done, reset the cursor position and return the file
-        # We could also decide to duplicate the file instead of resetting the cursor
-        if self.imports_done:
-            self.file_with_all_imports.seek(0)
-            error_mngr.log_message(
-                level='INFO',
-                message=f'Imports were already done on {self.path}, returning as is;'
-                        f' rewound to the beginning of the file.'
-            )
-            return self.file_with_all_imports
+    def expand(self):
+        """
+        Returns the text of the file with all imports done.
+        Imported files are expanded once per build if the environment has a source cache, once per PreParser otherwise.
+        The text of a page that is not imported is not kept, it is only expanded once.
+        :return: the text with all file imports done
+        :rtype: str
+        """
+        path = self.relative_path_resolver(self.name)
+        if path not in self.global_dict_of_imports:
+            return self.expand_imports()
+        if self._env.source_cache is not None:
+            return self._env.source_cache.expand(path, self.expand_imports)
+        if self.expanded_text is None:
+            self.expanded_text = self.expand_imports()
+        return self.expanded_text
 
-        temp_file = self.file_with_all_imports
+    def expand_imports(self):
+        """
+        Does all file imports, splicing the expanded text of every imported file in place of its import line.
+        :return: the text with all file imports done
+        :rtype: str
+        """
+        self.make_import_list()
+        parts = []
         source_line_count = 0
-        import_list = self.parse_import_list()
-        source_lines = self.readlines()
-        for import_path, import_line in import_list:
-            source_lines[import_line] = ""  # remove the line where the import was
-            temp_file.writelines(source_lines[source_line_count:import_line])  # copy origin to destination
-            source_line_count = import_line  # update origin for next import
-            import_file = self.global_dict_of_imports[import_path].export_with_imports()
-            temp_file.writelines(import_file.readlines())
-        temp_file.writelines(source_lines[source_line_count:])
-        temp_file.seek(0)
-        self.current_origin_for_read = temp_file
-        self.imports_done = True
-        return self.current_origin_for_read
+        source_lines = self.source_lines()
+        for import_path, import_line in self.parse_import_list():
+            parts += source_lines[source_line_count:import_line]  # copy origin to destination
+            source_line_count = import_line + 1  # update origin for next import, skipping the line of the import
+            parts.append(self.global_dict_of_imports[import_path].expand())
+        parts += source_lines[source_line_count:]
+        return "".join(parts)
 
     def parse_shortcuts_and_images(self):
         """
@@ -230,23 +356,83 @@ class PreParser:
         :return: The file descriptor of the file with all replacements
         :rtype: StringIO
         """
-        temp_file = self.file_with_all_imports
-        temp_text = ''
-        for line in temp_file.readlines():
-            line_match = syntax.line_to_replace.parse_string(line)
-            for match in line_match:
-                if match.label == 'text':
-                    temp_text = match.content.text
-                elif match.label == 'image':
-                    temp_text = self.get_image_from_config(match.content.image_name, match.content.optional)
-                elif match.label == 'alias':
-                    temp_text = self.get_alias_from_config(match.content.alias_name, match.content.optional)
-                self.file_with_all_replacements.write(temp_text)
+        text = self.file_with_all_imports.read()
+        self.file_with_all_replacements.writelines(self.replace_markers(text))
+        if text and not text.endswith("\n"):
             self.file_with_all_replacements.write("\n")
         self.file_with_all_replacements.seek(0)
         self.replacements_done = True
         return self.file_with_all_replacements
 
+    def replace_markers(self, text):
+        """
+        Yields the fragments of the text with its images and aliases replaced.
+        Only the lines containing a @{ or @[ marker are parsed, the others are copied as is (with their tabs expanded).
+        :param text: the text with all imports done
+        :type text: str
+        :rtype: iter[str]
+        """
+        position = 0
+        marker = _rgx_marker.search(text)
+        while marker is not None:
+            line_start = text.rfind("\n", 0, marker.start()) + 1
+            line_end = text.find("\n", marker.end())
+            if line_end < 0:
+                line_end = len(text)
+            yield text[position:line_start].expandtabs()
+            yield from self.replace_line(text[line_start:line_end])
+            position = line_end
+            marker = _rgx_marker.search(text, position)
+        yield text[position:].expandtabs()
+
+    def replace_line(self, line):
+        """
+        Returns the fragments of a line with its images and aliases replaced, the same way as syntax.line_to_replace.
+        :param line: the line, without its line break
+        :type line: str
+        :rtype: list[str]
+        """
+        line = line.expandtabs()
+        fragments = []
+        position = 0
+        has_images = True
+        while True:
+            start = _rgx_whitespace.match(line, position).end()
+            match = _rgx_image.search(line, start) if has_images else None
+            has_images = match is not None
+            replace = self.get_image_from_config
+            if match is None:
+                match = _rgx_alias.search(line, start)
+                replace = self.get_alias_from_config
+                if match is None:
+                    return fragments or [line]
+            optionals, position = self.parse_optionals(line, match.end())
+            fragments += (line[start:match.start()], replace(match.group(1), optionals))
+
+    @staticmethod
+    def parse_optionals(line, position):
+        """
+        Parses the optionals following an image or an alias, if any.
+        :param line: the line
+        :param position: the position of the end of the image or alias in the line
+        :type line: str
+        :type position: int
+        :return: the optionals (None if there are none), and the position of their end
+        :rtype: (syntax.OptionalToken | None, int)
+        """
+        brackets = _rgx_optionals.match(line, position)
+        if brackets is None:
+            return None, position
+        parsed = _optionals_memo.get(brackets.group())
+        if parsed is None:
+            try:
+                _, tokens, end = syntax.located_optional.parse_string(brackets.group())
+                parsed = (tokens[0], end)
+            except ParseException:
+                parsed = (None, 0)
+            _optionals_memo.put(brackets.group(), parsed)
+        return parsed[0], position + parsed[1]
+
     def get_element_from_config(self, *list_keys):
         """
         Fetches an element from the config (a nested dictionary) going through the list of keys
@@ -289,6 +475,32 @@ class PreParser:
             )
             return message
 
+    def get_alias_table(self):
+        """
+        Returns the alias table of the environment, it is created the first time if the environment has none.
+        :rtype: AliasTable
+        """
+        if self._env.alias_table is None:
+            self._env.alias_table = AliasTable(self._env.config, self._env.export_mngr)
+        return self._env.alias_table
+
+    def get_from_alias_table(self, section, shortcut, optionals):
+        """
+        Returns the html of an alias or an image from the alias table.
+        Raises the error of get_element_from_config if it is not in the config.
+        :param section: 'shortcuts' for an alias, 'images' for an image
+        :param shortcut: id of the alias or image
+        :param optionals: optional parameters along with it
+        :type section: str
+        :type shortcut: str
+        :type optionals: syntax.OptionalToken | None
+        :rtype: str
+        """
+        html = self.get_alias_table().render(section, shortcut, optionals)
+        if html is None:
+            self.get_element_from_config('aliases', section, shortcut)
+        return html
+
     def get_alias_from_config(self, shortcut, optionals):
         """
         Returns the alias from the config and makes the replacements with the options provided
@@ -299,10 +511,7 @@ class PreParser:
         :return: the html to insert as a string
         :rtype: str
         """
-        output = self.get_element_from_config('aliases', 'shortcuts', shortcut)
-        _, _, var_list, var_dict = syntax.split_optionals(optionals)
-
-        return self.make_replacements(output, *var_list, **var_dict)
+        return self.get_from_alias_table('shortcuts', shortcut, optionals)
 
     def get_image_from_config(self, shortcut, optionals):
         """
@@ -313,13 +522,7 @@ class PreParser:
         :type optionals: syntax.Optional
         :return: the html to insert as a string
         """
-        shortcut_s = self.get_element_from_config('aliases', 'images', shortcut)
-
-        _, _, var_list, var_dict = syntax.split_optionals(optionals)
-        request = export.ExportRequest('inline_elements', 'image', optionals)  # noqa : F841
-        output = self._env.export_mngr(request)
-
-        return output.start + self.make_replacements(shortcut_s, *var_list, **var_dict) + output.end
+        return self.get_from_alias_table('images', shortcut, optionals)
 
     def __repr__(self):
         """
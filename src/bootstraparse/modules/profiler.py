@@ -0,0 +1,349 @@
+"""
+Module measuring where the time of a build goes.
+A StageTimer records the wall and CPU time of the stages of a page (or of the whole build), the stages can be nested:
+the time of a stage doesn't include the time of the stages run inside it.
+When profiling is off, NULL_TIMER is used instead, its stages do nothing.
+A MemoryTracker wraps a timer, and also records the peak and retained memory of every stage with tracemalloc.
+Usage:
+ - from bootstraparse.modules.profiler import StageTimer, NULL_TIMER, write_report
+ - timer = StageTimer() if profiling else NULL_TIMER
+ - with timer.stage("parsing"): ...
+ - sink = timer.sink("write", file) # file-like object timing its writes as the "write" stage
+ - timer.times -> {"parsing": [wall, cpu], ...}
+ - write_report(path, build_times, page_reports) # JSON report, slowest pages first
+ - matches_any(path, ["pages/*.bpr"]) -> True if the path matches one of the glob patterns
+ - profile_call("page.html.pstats", function, *args) # runs function(*args) in cProfile, and dumps the stats
+ - tracker = MemoryTracker(timer) # same stages as the timer
+ - tracker.memory -> {"peak": bytes, "stages": {"parsing": {"peak": bytes, "retained": bytes, "modules": {module: bytes}}}}
+ - write_memory_report(path, build_memory, page_reports) # JSON report, hungriest pages first
+"""
+
+import contextlib
+import cProfile
+import fnmatch
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+
+class StageTimer:
+    """
+    Accumulates the wall and CPU time spent in every stage.
+    """
+    memory = None
+
+    def __init__(self):
+        self.times = {}
+        self._inner = [0.0, 0.0]  # Time spent in the stages nested in the current one
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager timing its body as the given stage.
+        :param name: The name of the stage.
+        :type name: str
+        """
+        outer, self._inner = self._inner, [0.0, 0.0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self.add(name, wall - self._inner[0], cpu - self._inner[1])
+            outer[0] += wall
+            outer[1] += cpu
+            self._inner = outer
+
+    def add(self, name, wall, cpu):
+        """
+        Adds some time to a stage.
+        :type name: str
+        :type wall: float
+        :type cpu: float
+        """
+        times = self.times.setdefault(name, [0.0, 0.0])
+        times[0] += wall
+        times[1] += cpu
+
+    def sink(self, name, file):
+        """
+        Returns a file-like object writing to file, the time spent writing is recorded as the given stage.
+        :type name: str
+        :type file: io.TextIOBase
+        :rtype: TimedSink
+        """
+        return TimedSink(self, name, file)
+
+    def close(self):
+        """
+        Nothing to release, for compatibility with MemoryTracker.
+        """
+
+
+class TimedSink:
+    """
+    Writable object forwarding the writes to a file, and timing them.
+    """
+    def __init__(self, timer, name, file):
+        self.timer = timer
+        self.name = name
+        self.file = file
+
+    def write(self, text):
+        with self.timer.stage(self.name):
+            return self.file.write(text)
+
+
+class NullTimer:
+    """
+    Timer used when profiling is off, doing as little as possible.
+    """
+    times = None
+    memory = None
+    _null_context = contextlib.nullcontext()
+
+    def stage(self, name):  # noqa
+        return self._null_context
+
+    def sink(self, name, file):  # noqa
+        return file
+
+    def close(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def summarize(times):
+    """
+    Converts the times of a timer into a JSON friendly dictionary.
+    :type times: dict[str, list[float]]
+    :rtype: dict[str, dict[str, float]]
+    """
+    return {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in times.items()}
+
+
+def write_report(path, build_times, page_reports):
+    """
+    Writes the JSON report of a profiled build: the time of the build-wide stages, the total of every stage over
+    all the pages, and every page with its stages, the slowest pages first.
+    :param path: The path of the report.
+    :param build_times: The times of the stages that are not specific to a page (crawl...).
+    :param page_reports: The reports of the pages built, their timings are the times of their stages.
+    :type path: str
+    :type build_times: dict[str, list[float]]
+    :type page_reports: list[bootstraparse.modules.sitecreator.PageReport]
+    """
+    totals = StageTimer()
+    pages = []
+    for report in page_reports:
+        if not report.timings:
+            continue
+        for name, (wall, cpu) in report.timings.items():
+            totals.add(name, wall, cpu)
+        pages.append({
+            "source": report.source,
+            "destination": report.destination,
+            "wall": sum(wall for wall, _ in report.timings.values()),
+            "cpu": sum(cpu for _, cpu in report.timings.values()),
+            "stages": summarize(report.timings),
+            "error": report.error,
+        })
+    pages.sort(key=lambda page: page["wall"], reverse=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"build": summarize(build_times), "stages": summarize(totals.times), "pages": pages}, f, indent=1)
+
+
+def matches_any(path, patterns):
+    """
+    Checks whether a path matches one of the glob patterns (the path separator is always /).
+    :param path: The path, relative to the origin of the website.
+    :param patterns: The glob patterns.
+    :type path: str
+    :type patterns: list[str]
+    :rtype: bool
+    """
+    path = path.replace(os.sep, "/")
+    return any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+
+
+def profile_call(path, function, *args):
+    """
+    Calls a function with cProfile, the stats are dumped to path (to be read with pstats), even if it raised.
+    :param path: The path of the .pstats file.
+    :param function: The function to profile.
+    :param args: The arguments of the function.
+    :type path: str
+    :type function: callable
+    :return: The return value of the function.
+    """
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(function, *args)
+    finally:
+        profile.dump_stats(path)
+
+
+# Number of modules kept in the report of every stage, the ones retaining the most memory
+TOP_MODULES = 10
+# Allocations made by the tracking itself (filtering the statistics is much faster than filtering the snapshots)
+_IGNORED_FILES = {tracemalloc.__file__, __file__, "<unknown>"}
+
+
+def module_name(filename):
+    """
+    Returns the name of the module of a source file, from the entries of sys.path.
+    :param filename: The path of the source file.
+    :type filename: str
+    :return: The dotted name of the module, or the filename if it isn't in sys.path.
+    :rtype: str
+    """
+    best = ""
+    for folder in sys.path:
+        folder = os.path.join(os.path.abspath(folder or os.curdir), "")
+        if filename.startswith(folder) and len(folder) > len(best):
+            best = folder
+    if not best:
+        return filename
+    return os.path.splitext(filename[len(best):])[0].replace(os.sep, ".")
+
+
+class MemoryTracker:
+    """
+    Records, with tracemalloc, the peak and retained memory of every stage, and delegates the timing to a timer.
+    The retained memory of a stage is grouped by the module that allocated it.
+    """
+    def __init__(self, timer=NULL_TIMER):
+        """
+        Starts tracemalloc if it isn't tracing yet.
+        :param timer: The timer the stages are also given to.
+        :type timer: StageTimer | NullTimer
+        """
+        self.timer = timer
+        self.stages = {}
+        self.peak = 0
+        self._peaks = []  # Highest memory reached by the enclosing stages, before the nested ones reset the peak
+        self.started = not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+
+    def close(self):
+        """
+        Stops tracemalloc if this tracker started it.
+        """
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    @property
+    def times(self):
+        return self.timer.times
+
+    @property
+    def memory(self):
+        """
+        Returns the highest memory traced during the stages, and the memory of every stage.
+        :rtype: dict
+        """
+        return {"peak": self.peak, "stages": self.stages}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager recording the memory allocated by its body as the given stage.
+        :param name: The name of the stage.
+        :type name: str
+        """
+        with self.timer.stage(name):
+            before = tracemalloc.take_snapshot()
+            start, peak = tracemalloc.get_traced_memory()
+            if self._peaks:  # The peak is reset below, the enclosing stage keeps the one it reached so far
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            self._peaks.append(0)
+            tracemalloc.reset_peak()
+            try:
+                yield
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, self._peaks.pop())
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                after = tracemalloc.take_snapshot()
+                self.add(name, peak - start, current - start, after.compare_to(before, "filename"))
+                self.peak = max(self.peak, peak)
+
+    def add(self, name, peak, retained, statistics):
+        """
+        Adds the memory of a run of a stage, the peak is the highest of all runs, the retained memory is summed.
+        :type name: str
+        :type peak: int
+        :type retained: int
+        :type statistics: list[tracemalloc.StatisticDiff]
+        """
+        memory = self.stages.setdefault(name, {"peak": 0, "retained": 0, "modules": {}})
+        memory["peak"] = max(memory["peak"], peak)
+        memory["retained"] += retained
+        modules = memory["modules"]
+        for statistic in statistics:
+            filename = statistic.traceback[0].filename
+            if statistic.size_diff and filename not in _IGNORED_FILES:
+                module = module_name(filename)
+                modules[module] = modules.get(module, 0) + statistic.size_diff
+        memory["modules"] = dict(sorted(modules.items(), key=lambda item: -abs(item[1]))[:TOP_MODULES])
+
+    def sink(self, name, file):
+        """
+        Writes are only timed, a snapshot per write would cost far more than the write itself.
+        """
+        return self.timer.sink(name, file)
+
+
+def write_memory_report(path, build_memory, page_reports):
+    """
+    Writes the JSON report of a build with memory tracking: the highest memory traced during the build (per process),
+    the memory of the build-wide stages, the highest peak and total retained memory of every stage over all the pages,
+    and every page with its stages, the pages with the highest peak first.
+    :param path: The path of the report.
+    :param build_memory: The memory of the build-wide stages.
+    :param page_reports: The reports of the pages built, with their memory.
+    :type path: str
+    :type build_memory: dict
+    :type page_reports: list[bootstraparse.modules.sitecreator.PageReport]
+    """
+    totals = {}
+    pages = []
+    peak = build_memory["peak"]
+    for report in page_reports:
+        if not report.memory:
+            continue
+        peak = max(peak, report.memory["peak"])
+        for name, memory in report.memory["stages"].items():
+            stage = totals.setdefault(name, {"peak": 0, "retained": 0, "modules": {}})
+            stage["peak"] = max(stage["peak"], memory["peak"])
+            stage["retained"] += memory["retained"]
+            for module, size in memory["modules"].items():
+                stage["modules"][module] = stage["modules"].get(module, 0) + size
+        pages.append({
+            "source": report.source,
+            "destination": report.destination,
+            "peak": max(memory["peak"] for memory in report.memory["stages"].values()),
+            "stages": report.memory["stages"],
+            "error": report.error,
+        })
+    pages.sort(key=lambda page: page["peak"], reverse=True)
+    for stage in totals.values():
+        stage["modules"] = dict(sorted(stage["modules"].items(), key=lambda item: -abs(item[1]))[:TOP_MODULES])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "peak": peak,
+            "build": build_memory["stages"],
+            "stages": totals,
+            "pages": pages,
+        }, f, indent=1)
@@ -7,6 +7,7 @@ Usage:
  - crawler.copy_unparsable_files()
  - for element, destination in crawler:
  -  - save(preparse_parse(element), destination, _env)
+ - crawler.set_all_destinations() # only lists the (source, destination) pairs, for parallel builds
 """
 
 import os
@@ -48,6 +49,7 @@ class SiteCrawler:
         self.files = []
         self.files_to_copy = []
         self.preparsers = []
+        self.pages = []
         self.global_dict_of_imports = {}
 
         # dictionaries
@@ -108,6 +110,25 @@ class SiteCrawler:
             if not os.path.exists(temp_path):
                 os.mkdir(temp_path)
 
+    def set_all_destinations(self, filter_func=None):
+        """
+        This method is used to create all the destination files and pair them with their source.
+        No file is read, so the pairs can be handed over to other processes.
+        The pairs are stored in the self.pages variable.
+        :param filter_func: Called with (source, destination), pages for which it returns False are left untouched.
+        :type filter_func: (callable | None)
+        :return: self.pages
+        :rtype: list[(str, str)]
+        """
+        self.pages = []
+        for root, file in self.files:
+            source = os.path.join(self.initial_path, root, file)
+            destination = os.path.join(self.destination_path, root, os.path.splitext(file)[0] + ".html")
+            if filter_func is None or filter_func(source, destination):
+                self.pages.append((source, self.create_file(destination)))
+
+        return self.pages
+
     def set_all_preparsers(self):
         """
         This method is used to set all the preparsers and initialize them.
@@ -115,22 +136,25 @@ class SiteCrawler:
         :return: self.preparsers
         :rtype: list[preparser.PreParser]
         """
-        for root, file in self.files:
-            preparser_path = os.path.join(self.initial_path, root, file)
-            pp = preparser.PreParser(preparser_path, self._env, dict_of_imports=self.global_dict_of_imports)
+        for source, destination in self.set_all_destinations():
+            pp = preparser.PreParser(source, self._env, dict_of_imports=self.global_dict_of_imports)
             pp.do_imports()
-            p = self.create_file(os.path.join(self.destination_path, root, os.path.splitext(file)[0] + ".html"))
-            self.preparsers.append((pp, p))
+            self.preparsers.append((pp, destination))
 
         return self.preparsers
 
-    def copy_unparsable_files(self):
+    def copy_unparsable_files(self, filter_func=None):
         """
         This method is used to copy all the files that could not be parsed.
+        :param filter_func: Called with (source, destination), files for which it returns False are not copied.
+        :type filter_func: (callable | None)
         """
         if self._env.config["parser_config"]["export"]["copy_unparsable_files"].lower() == "copy":
             for root, file in self.files_to_copy:
-                shutil.copy(os.path.join(self.initial_path, root, file), os.path.join(self.destination_path, root, file))
+                source = os.path.join(self.initial_path, root, file)
+                destination = os.path.join(self.destination_path, root, file)
+                if filter_func is None or filter_func(source, destination):
+                    shutil.copy(source, destination)
 
     def create_file(self, path):
         """
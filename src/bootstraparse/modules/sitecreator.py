@@ -2,41 +2,371 @@
 Module sequencing the successive actions necessary for website building
 Usage:
  - create_website(origin, destination)
+ - create_website(origin, destination, jobs=4) # builds the pages in 4 worker processes
+ - create_website(origin, destination, full_rebuild=True) # ignores the manifest of the previous build
+ - create_website(origin, destination, parse_cache=False) # parses every page, without reading or filling the parse cache
+ - create_website(origin, destination, profile_stages=True) # writes the time of every stage of every page to
+                                                             # destination/.bootstraparse/profile_stages.json
+                                                             # (every page is rebuilt, without the parse cache)
+ - create_website(origin, destination, profile_pages=["pages/*.bpr"]) # dumps a cProfile page.html.pstats next to
+                                                                      # the output of every matching page
+                                                                      # (always rebuilt, without the parse cache)
+ - create_website(origin, destination, memory_report=True) # writes the memory used by every stage of every page to
+                                                            # destination/.bootstraparse/memory_report.json
+                                                            # (every page is rebuilt, without the parse cache)
+ - build_website(env, changed={path, ...}) # rebuilds the pages depending on the changed files
 """
 
+import itertools
 import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
 
 from bootstraparse.modules import pathresolver, sitecrawler, environment, config, export, parser, context_mngr
+from bootstraparse.modules import preparser, error_mngr, manifest, cache, syntax, profiler
+
+"""
+Named tuple describing the outcome of the build of a single page,
+error is None if the page was built successfully, dependencies are the source and all the files it imports,
+timings are the [wall, cpu] times of every stage if the stages are profiled, memory the memory used by every stage
+if the memory is tracked, expansions the (files expanded, expansions reused, characters reused) counters of the imports,
+lines the (hits, misses) counters of the parser's line memo.
+"""
+PageReport = namedtuple("PageReport",
+                        ["source", "destination", "error", "dependencies", "timings", "memory", "expansions", "lines"],
+                        defaults=[None, (), None, None, (0, 0, 0), (0, 0)])
+
+PROFILE_STAGES_REPORT = "profile_stages.json"
+MEMORY_REPORT = "memory_report.json"
+
+# Environment and shared imports of a worker process, set by _init_worker
+_worker_env = None
+_worker_imports = {}
+# Build the shared imports of a worker process belong to, a pool can be kept between builds
+_worker_build = None
+_build_ids = itertools.count()
 
 
-def create_website(origin, destination):
+def create_website(origin, destination, jobs=1, full_rebuild=False, parse_cache=True, profile_stages=False,
+                   profile_pages=None, memory_report=False):
     """
     First function called by bparse.py,
     calls all other modules in the right order.
+    Unless full_rebuild is set (or incremental builds are disabled in the config),
+    only the pages whose source, imports or configs changed since the last build are rebuilt.
     :param origin: The path of the website to be built.
     :param destination: The destination path of the built website.
+    :param jobs: The number of worker processes used to build the pages.
+    :param full_rebuild: If True, all pages are rebuilt.
+    :param parse_cache: If False, the parse cache is disabled.
+    :param profile_stages: If True, the time spent in every stage of every page is reported.
+    :param profile_pages: Glob patterns (relative to origin) of the pages to build in cProfile.
+    :param memory_report: If True, the memory allocated by every stage of every page is reported.
     :type origin: str
     :type destination: str
+    :type jobs: int
+    :type full_rebuild: bool
+    :type parse_cache: bool
+    :type profile_stages: bool
+    :type profile_pages: list[str] | None
+    :type memory_report: bool
     :return: 0 if everything went well, 1 otherwise.
     """
-    env = create_environment(origin, destination)
-    crwlr = create_crawler(origin, destination, env)
-    crwlr.set_all_preparsers()
-    crwlr.copy_unparsable_files()
-    for element, destination in crwlr:
-        save(preparse_parse(element), destination, env)
+    env = create_environment(origin, destination, parse_cache)
+    env.profile_stages = profile_stages
+    env.profile_pages = profile_pages
+    env.memory_report = memory_report
+    return build_website(env, jobs, full_rebuild)
 
-    return 0
 
+def build_website(env, jobs=1, full_rebuild=False, changed=None, stop=None, pool=None):
+    """
+    Builds the website described by an already created environment.
+    :param env: The environment object.
+    :param jobs: The number of worker processes used to build the pages.
+    :param full_rebuild: If True, all pages are rebuilt.
+    :param changed: If given, the absolute paths of the only files that changed since the last build.
+    :param stop: Called between pages, the build is interrupted as soon as it returns True.
+    :param pool: A pool created by make_pool, kept between builds. If None, a pool is created for this build only.
+    :type env: environment.Environment
+    :type jobs: int
+    :type full_rebuild: bool
+    :type changed: set[str] | None
+    :type stop: (callable | None)
+    :type pool: ProcessPoolExecutor | None
+    :return: 0 if everything went well, 1 otherwise.
+    """
+    build_timer = make_timer(env)
+    if env.source_cache is not None:  # The sources may have changed since the previous build
+        env.source_cache.clear()
+    with build_timer.stage("crawl"):
+        crwlr = create_crawler(env.origin, env.destination, env)
+        full_rebuild = full_rebuild or not env.config["parser_config"]["export"]["incremental"] or profiles_every_page(env)
+        build_manifest = manifest.BuildManifest(env.destination, env, full_rebuild=full_rebuild, changed=changed)
+        pages = crwlr.set_all_destinations(
+            lambda source, destination: build_manifest.needs_build(source, destination) or is_profiled(source, env)
+        )
+        crwlr.copy_unparsable_files(build_manifest.needs_copy)
 
-def create_environment(origin, destination):
+    return_code = 0
+    built = set()
+    reports = []
+    expansions = [0, 0, 0]  # Summed from the reports, the pages may be built in worker processes
+    lines = [0, 0]
+    for report in build_pages(pages, env, jobs, crwlr.global_dict_of_imports, stop, pool):
+        built.add(report.destination)
+        expansions = [total + count for total, count in zip(expansions, report.expansions)]
+        lines = [total + count for total, count in zip(lines, report.lines)]
+        if env.profile_stages or env.memory_report:
+            reports.append(report)
+        if report.error is not None:
+            error_mngr.log_message(f"Could not build {report.source} into {report.destination}: {report.error}")
+            build_manifest.forget(report.destination)
+            return_code = 1
+        else:
+            build_manifest.record_page(report.source, report.destination, report.dependencies)
+    for source, destination in pages:
+        if destination not in built:  # The build was stopped before this page
+            build_manifest.forget(destination)
+    for removed in build_manifest.remove_stale():
+        error_mngr.log_message(f"Removed {removed}, its source is gone.", level="INFO")
+    build_manifest.save()
+    if env.source_cache is not None:
+        env.source_cache.clear()  # Releases the sources, they are read again by the next build anyway
+    if lines[0] or lines[1]:
+        error_mngr.log_message(f"Line memo: {lines[0]} of {lines[0] + lines[1]} lines not parsed again "
+                               f"({lines[0] / (lines[0] + lines[1]):.0%}).", level="INFO")
+    if expansions[1]:
+        error_mngr.log_message(f"Imports: {expansions[0]} files expanded, reused {expansions[1]} times ({expansions[2]} "
+                               f"characters not expanded again).", level="INFO")
+    if env.parse_cache is not None:
+        env.parse_cache.evict()
+    if env.profile_stages:
+        report_path = os.path.join(env.destination, manifest.METADATA_FOLDER, PROFILE_STAGES_REPORT)
+        profiler.write_report(report_path, build_timer.times, reports)
+        error_mngr.log_message(f"Stage timings written to {report_path}.", level="INFO")
+    if env.memory_report:
+        report_path = os.path.join(env.destination, manifest.METADATA_FOLDER, MEMORY_REPORT)
+        profiler.write_memory_report(report_path, build_timer.memory, reports)
+        build_timer.close()
+        error_mngr.log_message(f"Memory report written to {report_path}.", level="INFO")
+
+    return return_code
+
+
+def build_pages(pages, env, jobs=1, dict_of_imports=None, stop=None, pool=None):
+    """
+    Builds every page, in this process if jobs is 1, in a pool of worker processes otherwise.
+    The reports are yielded in the same order as the pages.
+    :param pages: The list of (source, destination) pairs to build.
+    :param env: The environment object.
+    :param jobs: The number of worker processes to use.
+    :param dict_of_imports: The imports shared between the pages built in this process.
+    :param stop: Called between pages, the remaining pages are skipped as soon as it returns True.
+    :param pool: A pool created by make_pool, kept between builds. If None, a pool is created for this build only.
+    :type pages: list[(str, str)]
+    :type env: environment.Environment
+    :type jobs: int
+    :type dict_of_imports: dict[str, preparser.PreParser]
+    :type stop: (callable | None)
+    :type pool: ProcessPoolExecutor | None
+    :return: One report per page built.
+    :rtype: iter[PageReport]
+    """
+    if jobs <= 1 or len(pages) <= 1:
+        for source, destination in pages:
+            if stop is not None and stop():
+                return
+            yield build_page(source, destination, env, dict_of_imports)
+        return
+
+    if pool is None:
+        with make_pool(env, jobs) as pool:
+            yield from build_pages(pages, env, jobs, dict_of_imports, stop, pool)
+        return
+
+    build = next(_build_ids)
+    chunksize = max(1, len(pages) // (jobs * 4))
+    futures = [pool.submit(_build_chunk_in_worker, build, pages[i:i + chunksize]) for i in range(0, len(pages), chunksize)]
+    try:
+        for future in futures:
+            for report in future.result():
+                if stop is not None and stop():
+                    return
+                yield report
+    finally:
+        # The pool may outlive this build, the pages still running must not overlap with the next one
+        for future in futures:
+            future.cancel()
+        wait(futures)
+
+
+def make_pool(env, jobs):
+    """
+    Creates a pool of worker processes, every worker loads the environment once, when it starts.
+    The pool can be used for several builds, as long as the configs and templates do not change.
+    :param env: The environment object.
+    :param jobs: The number of worker processes.
+    :type env: environment.Environment
+    :type jobs: int
+    :rtype: ProcessPoolExecutor
+    """
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                               initargs=(env.origin, env.destination, env.parse_cache is not None, env.profile_stages,
+                                         env.profile_pages, env.memory_report))
+
+
+def build_page(source, destination, env, dict_of_imports=None):
+    """
+    Runs the whole chain (preparse, parse, context, export, write) for a single page.
+    Errors are caught so they can be reported along with the page they come from.
+    Pages matching the env.profile_pages globs are built in cProfile, the stats are dumped next to the output.
+    :param source: The path of the .bpr file.
+    :param destination: The path of the html file.
+    :param env: The environment object.
+    :param dict_of_imports: Dictionary of the imports already made, shared between pages.
+    :type source: str
+    :type destination: str
+    :type env: environment.Environment
+    :type dict_of_imports: dict[str, preparser.PreParser]
+    :return: The report of the build.
+    :rtype: PageReport
+    """
+    if is_profiled(source, env):
+        return profiler.profile_call(destination + ".pstats", _build_page, source, destination, env, dict_of_imports,
+                                     False)
+    return _build_page(source, destination, env, dict_of_imports)
+
+
+def _build_page(source, destination, env, dict_of_imports, use_parse_cache=True):
+    """
+    Same as build_page, without the cProfile.
+    The parse cache is bypassed for the profiled pages, so that the parser itself is measured.
+    :param use_parse_cache: If False, the page is parsed even if it is in the parse cache.
+    :type use_parse_cache: bool
+    :rtype: PageReport
+    """
+    timer = make_timer(env)
+    parse_cache = env.parse_cache if use_parse_cache and not profiles_every_page(env) else None
+    expansions = env.source_cache.counters() if env.source_cache is not None else (0, 0, 0)
+    lines = parser.line_memo.hits, parser.line_memo.misses
+    try:
+        with timer.stage("imports"):
+            pp = preparser.PreParser(source, env, dict_of_imports=dict_of_imports)
+        containers = preparse_parse(pp, parse_cache, timer, env.token_stream_size)
+        with timer.stage("export"):
+            save(containers, destination, env, timer)
+        dependencies = [source] + pp.get_import_closure()
+        if env.source_cache is not None:
+            expansions = tuple(after - before for after, before in zip(env.source_cache.counters(), expansions))
+        lines = parser.line_memo.hits - lines[0], parser.line_memo.misses - lines[1]
+    except Exception as e:
+        # The stages run before the error are still reported, a page may be slow and then fail
+        return PageReport(source, destination, f"{type(e).__name__}: {e}", timings=timer.times, memory=timer.memory)
+    finally:
+        timer.close()  # Stops tracemalloc if the page started it (in a worker process)
+    return PageReport(source, destination, dependencies=dependencies, timings=timer.times, memory=timer.memory,
+                      expansions=expansions, lines=lines)
+
+
+def is_profiled(source, env):
+    """
+    Checks whether a page is built in cProfile, in which case it is always rebuilt, without the parse cache.
+    :param source: The path of the .bpr file.
+    :param env: The environment object.
+    :type source: str
+    :type env: environment.Environment
+    :rtype: bool
+    """
+    return bool(env.profile_pages) and profiler.matches_any(os.path.relpath(source, env.origin), env.profile_pages)
+
+
+def profiles_every_page(env):
+    """
+    Checks whether the build is profiled page by page, in which case every page is rebuilt without the parse cache.
+    :param env: The environment object.
+    :type env: environment.Environment
+    :rtype: bool
+    """
+    return env.profile_stages or env.memory_report
+
+
+def make_timer(env):
+    """
+    Returns the object the stages of a page or of a build are run in, according to the profiling options.
+    :param env: The environment object.
+    :type env: environment.Environment
+    :rtype: profiler.StageTimer | profiler.MemoryTracker | profiler.NullTimer
+    """
+    timer = profiler.StageTimer() if env.profile_stages else profiler.NULL_TIMER
+    if env.memory_report:
+        timer = profiler.MemoryTracker(timer)
+    return timer
+
+
+def _init_worker(origin, destination, parse_cache=True, profile_stages=False, profile_pages=None, memory_report=False):
+    """
+    Initializer of the worker processes, every worker loads the configs and templates once.
+    :param origin: The path of the website to be built.
+    :param destination: The destination path of the built website.
+    :param parse_cache: If False, the parse cache is disabled.
+    :param profile_stages: If True, the stages of every page are timed.
+    :param profile_pages: Glob patterns of the pages to build in cProfile.
+    :param memory_report: If True, the memory of the stages of every page is tracked.
+    :type origin: str
+    :type destination: str
+    :type parse_cache: bool
+    :type profile_stages: bool
+    :type profile_pages: list[str] | None
+    :type memory_report: bool
+    """
+    global _worker_env
+    _worker_env = create_environment(origin, destination, parse_cache)
+    _worker_env.profile_stages = profile_stages
+    _worker_env.profile_pages = profile_pages
+    _worker_env.memory_report = memory_report
+    _worker_imports.clear()
+
+
+def _build_chunk_in_worker(build, pages):
+    """
+    Builds some pages inside a worker process.
+    The imports and sources kept by the worker are dropped when the pages belong to a new build, they may have changed.
+    :param build: The identifier of the build the pages belong to.
+    :param pages: The (source, destination) pairs to build.
+    :type build: int
+    :type pages: list[(str, str)]
+    :rtype: list[PageReport]
+    """
+    global _worker_build
+    if build != _worker_build:
+        _worker_build = build
+        _worker_imports.clear()
+        if _worker_env.source_cache is not None:
+            _worker_env.source_cache.clear()
+    return [_build_in_worker(page) for page in pages]
+
+
+def _build_in_worker(page):
+    """
+    Builds a page inside a worker process.
+    :param page: The (source, destination) pair to build.
+    :type page: (str, str)
+    :rtype: PageReport
+    """
+    return build_page(page[0], page[1], _worker_env, _worker_imports)
+
+
+def create_environment(origin, destination, parse_cache=True):
     """
     Returns parserEnvironment as an object containing
     everything needed for app execution.
     :param origin: The path of the website to be built.
     :param destination: The destination path of the built website.
+    :param parse_cache: If False, the parse cache is disabled even if enabled in the config.
     :type origin: str
     :type destination: str
+    :type parse_cache: bool
     :return: Environment object.
     :rtype: environment.Environment
     """
@@ -53,6 +383,21 @@ def create_environment(origin, destination):
     env.origin = origin
     env.destination = destination
 
+    parser.line_memo.max_size = env.config["parser_config"]["parsing"]["line_memo_size"]
+    packrat_config = env.config["parser_config"]["parsing"]["packrat"]
+    syntax.set_packrat(packrat_config["enabled"], packrat_config["cache_size"])
+    cache_config = env.config["parser_config"]["parsing"]["cache"]
+    if parse_cache and cache_config["enabled"]:
+        env.parse_cache = cache.ParseCache(os.path.join(destination, manifest.METADATA_FOLDER, "parse_cache"),
+                                           max_size=cache_config["max_size_mb"] * 2 ** 20)
+    token_stream_config = env.config["parser_config"]["parsing"]["token_stream"]
+    if token_stream_config["enabled"]:
+        env.token_stream_size = token_stream_config["min_size_mb"] * 2 ** 20
+    env.alias_table = preparser.AliasTable(env.config, env.export_mngr,
+                                           env.config["parser_config"]["parsing"]["alias_memo_size"])
+    if env.config["parser_config"]["parsing"]["source_cache"]["enabled"]:
+        env.source_cache = cache.SourceCache()
+
     return env
 
 
@@ -71,32 +416,53 @@ def create_crawler(origin, destination, _env):
     return sitecrawler.SiteCrawler(origin, destination, _env)
 
 
-def preparse_parse(preparser):
+def preparse_parse(pp, parse_cache=None, timer=profiler.NULL_TIMER, token_stream_size=None):
     """
     Returns a list of containers from a preparser.
-    :param preparser: The preparser object.
-    :type preparser: parser.Preparser
+    :param pp: The preparser object.
+    :param parse_cache: If given, the cache of the parsed texts.
+    :param timer: The timer of the stages.
+    :param token_stream_size: If given, texts of at least this many characters are parsed into a TokenStream.
+    :type pp: preparser.PreParser
+    :type parse_cache: cache.ParseCache
+    :type timer: profiler.StageTimer
+    :type token_stream_size: int | None
     :return: List of containers.
     :rtype: list
     """
-    io = preparser.do_replacements()
-    parsed_list = parser.parse_line(io)
-    output = context_mngr.ContextManager(parsed_list, name=preparser.name)()
+    with timer.stage("imports"):
+        pp.do_imports()
+    with timer.stage("replacements"):
+        io = pp.parse_shortcuts_and_images()
+    with timer.stage("parsing"):
+        if token_stream_size is not None and io.seek(0, os.SEEK_END) >= token_stream_size:
+            io.seek(0)
+            parsed_list = parser.parse_stream(io)
+        else:
+            io.seek(0)
+            parsed_list = parser.parse_line(io, parse_cache)
+    with timer.stage("contextualization"):
+        output = context_mngr.ContextManager(parsed_list, name=pp.name)()
     return output
 
 
-def save(list_of_containers, destination, env):
+def save(list_of_containers, destination, env, timer=profiler.NULL_TIMER):
     """
     Saves the list of containers in the destination path.
     :param list_of_containers: The list of containers to be saved.
     :param destination: The destination path.
     :param env: The environment object.
+    :param timer: The timer of the stages, the writes to the file are timed as the "write" stage.
     :type list_of_containers: list
     :type destination: str
     :type env: environment.Environment
+    :type timer: profiler.StageTimer
     """
     with open(destination, "w") as output_file:
-        output_file.write(export.ContextConverter(list_of_containers, env.export_mngr, destination).process_pile().read())
+        export.ContextConverter(list_of_containers, env.export_mngr, destination,
+                                timer.sink("write", output_file)).process_pile()
+        with timer.stage("write"):
+            output_file.flush()
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -6,12 +6,17 @@
 # Usage:
 #   from bootstraparse.modules.syntax import line
 #   line.parse_line('string') # returns a List of tokens
+#   parse_routed('string') # same tokens as line.parseString('string').asList(), only tries the expressions that can match
 #   line_to_replace.parse_line('string') # returns a List of tokens parsed for replacements
 #   imports.parse_line('string', True) # returns a List of tokens parsed for imports
 #   any_token.create_diagram("filename") # Debugging
+#   set_packrat(True, cache_size=128) # Turns pyparsing's packrat memoization on for the whole grammar
+# Tokens are slotted, and the parse actions of of_type give them plain content: tuples and strings instead of ParseResults
 """
 
 import os
+import re
+import sys
 from itertools import zip_longest
 from collections import namedtuple
 
@@ -22,23 +27,90 @@ import pyparsing as pp
 pps = pp.Suppress
 
 
+class TokenLabel:
+    """
+    Label of the tokens: the label of their class, unless one was given to the token itself.
+    The labels written in the bodies of the classes are moved to class_label by SemanticType.__init_subclass__.
+    """
+    def __get__(self, token, token_class):
+        if token is None or token._label is None:
+            return token_class.class_label
+        return token._label
+
+    def __set__(self, token, label):
+        token._label = label
+
+
+class NamedContent(tuple):
+    """
+    Plain content of the tokens whose named results are used, which are also available as attributes.
+    """
+    def __new__(cls, items=(), **names):
+        content = super().__new__(cls, items)
+        content.__dict__.update(names)
+        return content
+
+
+def plain(content):
+    """
+    Converts parse results to tuples, recursively.
+    :param content: The content of a token.
+    :type content: pp.ParseResults | object
+    :rtype: tuple | object
+    """
+    if isinstance(content, pp.ParseResults):
+        return tuple(plain(element) for element in content)
+    return content
+
+
 # Semantic group types
 class SemanticType:
     """
     Allows us to access basic operations and identify each token parsed.
     """
-    label = None
+    __slots__ = ("content", "line_number", "file_name", "index", "ident", "_label")
+    class_label = None
+    label = TokenLabel()
+    content_names = ()  # The named results of the parser kept in the content, see plain_content
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if isinstance(cls.__dict__.get("label"), str):
+            cls.class_label = sys.intern(cls.__dict__["label"])
+            del cls.label
 
     def __init__(self, content):
         """
         Initialises the token.
         :param content: The content of the token.
-        :type content: list[pp.ParseResults]
+        :type content: tuple | list | str
         """
         self.content = content
         self.line_number = "Undefined"
         self.file_name = "Undefined"
-        self.label_container = self.label
+        self._label = None
+
+    @classmethod
+    def plain_content(cls, content):
+        """
+        Converts the parse results of a token to its content.
+        :param content: The parse results.
+        :type content: pp.ParseResults
+        :return: The results as tuples, along with the named results listed in content_names if there are any.
+        :rtype: tuple | NamedContent
+        """
+        if cls.content_names:
+            named = content if isinstance(content, pp.ParseResults) else {}
+            return NamedContent(plain(content), **{name: plain(named.get(name, '')) for name in cls.content_names})
+        return plain(content)
+
+    @property
+    def label_container(self):
+        """
+        The label used to find the container of the token (the label of its class).
+        :rtype: str
+        """
+        return type(self).class_label
 
     def to_markup(self):
         """
@@ -67,6 +139,8 @@ class SemanticType:
     def __str__(self):
         if type(self.content) == str:
             return f'{self.label}[{self.content}]'
+        elif isinstance(self.content, tuple):
+            return f'{self.label}{list(self.content)}'
         else:
             return f'{self.label}{self.content}'
 
@@ -76,7 +150,7 @@ class SemanticType:
     def __eq__(self, other):
         if type(other) == type(self):
             for e1, e2 in zip_longest(self.content, other.content):
-                if isinstance(e1, (pp.ParseResults, list)):  # if it's a list, we need to compare each element
+                if isinstance(e1, (pp.ParseResults, list, tuple)):  # if it's a list, we need to compare each element
                     for elt1, elt2 in zip_longest(e1, e2):
                         if elt1 != elt2:
                             return False
@@ -115,7 +189,7 @@ class TokensToMatch(SemanticType):
     Class used for verification in the context manager.
     Classes inheriting this should be added to matched_elements.
     """
-    pass
+    __slots__ = ()
 
 
 class AddFirstElementToLabel(SemanticType):
@@ -123,9 +197,11 @@ class AddFirstElementToLabel(SemanticType):
     Class used for verification in the context manager.
     Adds the first element of the content to the label (for matching purposes).
     """
+    __slots__ = ("_addendum",)
+
     def __init__(self, content):
         super().__init__(content)
-        self.label += ":" + content[0]
+        self.label = sys.intern(self.label + ":" + content[0])
         self._addendum = content[0]
 
 
@@ -133,6 +209,8 @@ class ExplicitSemanticType(SemanticType):
     """
     Explicit semantic type, the label is the only information we need.
     """
+    __slots__ = ()
+
     def counterpart(self):
         return self.label
 
@@ -150,6 +228,7 @@ class FinalSemanticType(SemanticType):
     """
     Semantic type used by the context manager to ascertain token is possible to encapsulate.
     """
+    __slots__ = ()
 
     def counterpart(self):  # noqa
         return None
@@ -162,6 +241,8 @@ class OpenedSemanticType(SemanticType):
     """
     Semantic type used to signify it has a matching end component and needs to be matched.
     """
+    __slots__ = ()
+
     def to_container(self, filter_func=None):
         if filter_func is None:
             raise MismatchedContainerError(self)
@@ -174,6 +255,7 @@ class ClosedSemanticType(SemanticType):
     """
     Semantic type used to signify it has a matching start component and needs to be matched.
     """
+    __slots__ = ()
     # def counterpart(self):
     #     return self.label[:-4]+'start'
 
@@ -182,6 +264,8 @@ class EmptySemanticType(FinalSemanticType):
     """
     Empty semantic type, the content is the only information we need.
     """
+    __slots__ = ()
+
     def to_markup(self):
         if type(self.content) == str:
             return f'{self.content}'
@@ -190,18 +274,24 @@ class EmptySemanticType(FinalSemanticType):
 
 
 class UnimplementedToken(SemanticType):
+    __slots__ = ()
     label = "unimplemented"
 
 
 class AliasToken(SemanticType):
+    __slots__ = ()
     label = "alias"
+    content_names = ("alias_name", "optional")
 
 
 class ImageToken(SemanticType):
+    __slots__ = ()
     label = "image"
+    content_names = ("image_name", "optional")
 
 
 class TextToken(EmptySemanticType):
+    __slots__ = ()
     label = "text"
 
     def to_container(self, filter_func=None):
@@ -211,36 +301,43 @@ class TextToken(EmptySemanticType):
 # FUTURE: all one-line elements should to inherit FinalSemanticType
 class EtEmToken(ExplicitSemanticType, TokensToMatch):
     """*"""
+    __slots__ = ()
     label = "text:em"
 
 
 class EtStrongToken(ExplicitSemanticType, TokensToMatch):
     """**"""
+    __slots__ = ()
     label = "text:strong"
 
 
 class EtUnderlineToken(ExplicitSemanticType, TokensToMatch):
     """__"""
+    __slots__ = ()
     label = "text:underline"
 
 
 class EtStrikethroughToken(ExplicitSemanticType, TokensToMatch):
     """~~"""
+    __slots__ = ()
     label = "text:strikethrough"
 
 
 class EtCustomSpanToken(AddFirstElementToLabel, ExplicitSemanticType, TokensToMatch):
     """(#int)"""
+    __slots__ = ()
     label = "text:custom_span"
 
 
 class EtUlistToken(FinalSemanticType):
     """-"""
+    __slots__ = ()
     label = "list:ulist"
 
 
 class EtOlistToken(FinalSemanticType):
     """#."""
+    __slots__ = ()
     label = "list:olist"
 
 
@@ -249,6 +346,7 @@ class HeaderToken(FinalSemanticType):
     # string #
     number of # indicates level
     """
+    __slots__ = ()
     label = "header"
 
 
@@ -257,16 +355,19 @@ class DisplayToken(FinalSemanticType):
     ! string !
     number of ! indicates level
     """
+    __slots__ = ()
     label = "display"
 
 
 class StructuralElementStartToken(AddFirstElementToLabel, OpenedSemanticType, TokensToMatch):
     """<<div|article|section|aside|header|body|nav"""
+    __slots__ = ()
     label = 'se:start'
 
 
 class StructuralElementEndToken(AddFirstElementToLabel, ClosedSemanticType):
     """div|article|section|aside|header|body|nav>>"""
+    __slots__ = ()
     label = "se:end"
 
     def counterpart(self):
@@ -274,67 +375,83 @@ class StructuralElementEndToken(AddFirstElementToLabel, ClosedSemanticType):
 
 
 class HyperlinkToken(FinalSemanticType):
+    __slots__ = ()
     label = "hyperlink"
+    content_names = ("text", "url")
 
 
 class TableToken(SemanticType):
+    __slots__ = ()
     label = "table"
 
 
 class TableRowToken(SemanticType):
+    __slots__ = ()
     label = "table:row"
 
 
 class TableCellToken(SemanticType):
+    __slots__ = ()
     label = "table:cell"
 
 
 class TableSeparatorToken(SemanticType):
+    __slots__ = ()
     label = "table:separator"
 
 
 class OptionalToken(SemanticType):
+    __slots__ = ()
     label = "optional"
 
 
 class OptionalInsertToken(SemanticType):
+    __slots__ = ()
     label = "optional:insert"
 
 
 class OptionalVarToken(SemanticType):
+    __slots__ = ()
     label = "optional:var"
 
 
 class OptionalClassToken(SemanticType):
+    __slots__ = ()
     label = "optional:class"
 
 
 class BeAssignToken(SemanticType):
+    __slots__ = ()
     label = "be:assign"
 
 
 class BeValueToken(SemanticType):
+    __slots__ = ()
     label = "be:var"
 
 
 class BlockQuoteToken(SemanticType):
+    __slots__ = ()
     label = "bq:text"
 
 
 class BlockQuoteAuthorToken(SemanticType):
+    __slots__ = ()
     label = "bq:author"
 
 
 class CodeToken(ExplicitSemanticType, TokensToMatch):
+    __slots__ = ()
     label = "code"
 
 
 class Linebreak(ExplicitSemanticType):
+    __slots__ = ()
     label = "linebreak"
 
     def __init__(self, content):
         super().__init__(content)
-        self.content = []  # force content empty to avoid any potential issue with lookahead
+        self.content = ()  # force content empty to avoid any potential issue with lookahead
 
     def to_container(self, filter_func=None):
         return self
@@ -351,7 +468,7 @@ def of_type(token_class):
     def _of_type(_, __, content):
         if len(content) == 0:  # Drop Empty token
             return None
-        return token_class(content)
+        return token_class(token_class.plain_content(content))
 
     return _of_type
 
@@ -546,6 +663,42 @@ one_line = (one_header | one_display | one_olist | one_ulist)
 # Final elements
 line = one_line | multi_line | enhanced_text
 
+# Line router: the expressions of line that can match, by first non-blank character
+# (every alternative of line but enhanced_text starts with a specific character or a structural element)
+routed_lines = {
+    '#': one_header | one_olist | enhanced_text,
+    '!': one_display | enhanced_text,
+    '-': one_ulist | enhanced_text,
+    '<': se_start | enhanced_text,
+    '|': table | enhanced_text,
+    '>': quotation | enhanced_text,
+}
+routed_se_end = se_end | enhanced_text
+rgx_structural_element = re.compile(r'div|article|aside|section|header|body|nav', re.IGNORECASE)
+rgx_markup = re.compile(r'[\[*\t]|~~|__|\(#|```')  # Tabs are expanded by pyparsing, let it handle them
+
+
+def parse_routed(string):
+    """
+    Parses a line with the only expressions of line that can match it, plain text doesn't go through pyparsing.
+    :param string: The line to parse.
+    :type string: str
+    :return: The same tokens as line.parseString(string).asList()
+    :rtype: list[SemanticType]
+    """
+    text = string.lstrip(' \n\t\r')
+    if not text:
+        return []
+    expression = routed_lines.get(text[0])
+    if expression is None:
+        if rgx_structural_element.match(text):
+            expression = routed_se_end
+        elif rgx_markup.search(text):
+            expression = enhanced_text
+        else:
+            return [TextToken((text.split('\n', 1)[0],))]
+    return expression.parseString(string).asList()
+
 
 ##############################################################################
 # Pre_parser elements
@@ -554,6 +707,7 @@ line = one_line | multi_line | enhanced_text
 # Composite elements
 image = image_element + pp.Opt(optional)
 alias = alias_element + pp.Opt(optional)
+located_optional = pp.Located(optional)  # [start, [OptionalToken], end], used by the replacement engine
 
 # Syntax elements
 line_to_replace = pp.OneOrMore(
@@ -562,6 +716,20 @@ line_to_replace = pp.OneOrMore(
 ) | pp.rest_of_line('text').add_parse_action(of_type(TextToken))
 
 
+def set_packrat(enabled, cache_size=128):
+    """
+    Turns pyparsing's packrat memoization on or off, for every grammar of the process.
+    Alternatives, SkipTo and match_previous_literal then stop re-trying the same expressions at the same positions.
+    :param enabled: Whether to memoize the parse results.
+    :param cache_size: The number of results kept, None for an unbounded cache.
+    :type enabled: bool
+    :type cache_size: int | None
+    """
+    pp.ParserElement.disable_memoization()
+    if enabled:
+        pp.ParserElement.enable_packrat(cache_size_limit=cache_size)
+
+
 ##############################################################################
 # Temporary tests
 ##############################################################################
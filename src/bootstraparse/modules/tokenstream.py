@@ -0,0 +1,142 @@
+"""
+Compact representation of the output of the parser, for large documents.
+The kind of every token is a small int in an array, and the content of the tokens made of one string found in their
+line is stored as offsets into the source text. The other contents (headers, optionals, links...) are kept as is.
+Tokens are only created when they are read, the most recently read ones are kept so that reading a token twice
+returns the same object (the context manager mutates the tokens it is given).
+Only the output of the parser is smaller: the context manager still creates and keeps every token of the page, so the
+peak memory of a build barely moves.
+Usage:
+ - from bootstraparse.modules.tokenstream import TokenStream
+ - stream = TokenStream(text)
+ - stream.add_line(line_start, line, tokens) # for every line of text, with the tokens parsed from it
+ - len(stream) ; stream[index] -> syntax.SemanticType ; stream[start:end] -> list of tokens ; iter(stream)
+"""
+
+from array import array
+
+from bootstraparse.modules import syntax
+from bootstraparse.modules.cache import LRUCache
+
+
+def token_classes(base=syntax.SemanticType):
+    """
+    Returns every class of token, in a stable order: their index is the kind of their tokens in a TokenStream.
+    :param base: The class whose subclasses are listed.
+    :type base: type
+    :rtype: list[type]
+    """
+    classes = [base]
+    for subclass in sorted(base.__subclasses__(), key=lambda c: c.__qualname__):
+        classes += [c for c in token_classes(subclass) if c not in classes]
+    return classes
+
+
+TOKEN_CLASSES = token_classes()
+KINDS = {token_class: kind for kind, token_class in enumerate(TOKEN_CLASSES)}
+NO_OFFSET = -1
+
+
+class TokenStream:
+    """
+    Sequence of tokens stored as arrays of kinds and offsets, the tokens are created when they are read.
+    """
+    def __init__(self, text, recent_size=256):
+        """
+        :param text: The source text the tokens were parsed from.
+        :param recent_size: The number of tokens created that are kept, to return the same object when read again.
+        :type text: str
+        :type recent_size: int
+        """
+        self.text = text
+        self.kinds = array("H")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.contents = {}  # Contents that aren't a string of the text, by index
+        self.recent = LRUCache(max_size=recent_size)
+
+    def append(self, token, line_start=0, line="", position=0):
+        """
+        Adds a token at the end of the stream.
+        :param token: The token to add.
+        :param line_start: The offset in the text of the line the token was parsed from.
+        :param line: The line the token was parsed from.
+        :param position: The position in the line its content is looked for from.
+        :type token: syntax.SemanticType
+        :type line_start: int
+        :type line: str
+        :type position: int
+        :return: The position in the line after the content of the token, or position if it wasn't found in the line.
+        :rtype: int
+        """
+        index = len(self.kinds)
+        kind = KINDS.get(type(token))
+        if kind is None:  # Not a class of the syntax module, kept as is
+            kind = 0
+            self.contents[index] = token
+        self.kinds.append(kind)
+        content = token.content
+        if index not in self.contents:
+            if type(content) is tuple and len(content) == 1 and type(content[0]) is str:
+                found = line.find(content[0], position)
+                if found >= 0:
+                    self.starts.append(line_start + found)
+                    self.ends.append(line_start + found + len(content[0]))
+                    return found + len(content[0])
+            if content:
+                self.contents[index] = content
+        self.starts.append(NO_OFFSET)
+        self.ends.append(NO_OFFSET)
+        return position
+
+    def add_line(self, line_start, line, tokens):
+        """
+        Adds the tokens parsed from a line of the text, their contents are looked for in order in the line.
+        :param line_start: The offset of the line in the text.
+        :param line: The line.
+        :param tokens: The tokens parsed from the line.
+        :type line_start: int
+        :type line: str
+        :type tokens: list[syntax.SemanticType]
+        """
+        position = 0
+        for token in tokens:
+            position = self.append(token, line_start, line, position)
+
+    def materialize(self, index):
+        """
+        Creates the token at an index of the stream.
+        :type index: int
+        :rtype: syntax.SemanticType
+        """
+        content = self.contents.get(index)
+        if isinstance(content, syntax.SemanticType):
+            return content
+        if self.starts[index] != NO_OFFSET:
+            content = (self.text[self.starts[index]:self.ends[index]],)
+        return TOKEN_CLASSES[self.kinds[index]](() if content is None else content)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        """
+        Returns the token at an index (the same object as the last time if it was read recently), or a list of tokens.
+        :type index: int | slice
+        :rtype: syntax.SemanticType | list[syntax.SemanticType]
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TokenStream index out of range")
+        token = self.recent.get(index)
+        if token is None:
+            token = self.materialize(index)
+            self.recent.put(index, token)
+        return token
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,159 @@
+"""
+Module keeping a website up to date while its sources are being edited.
+The origin folder is polled with os.stat, and only the pages depending on the files that changed are rebuilt.
+If files change again while a rebuild is running, the rebuild is interrupted and the changes are merged into the next one.
+Usage:
+ - from bootstraparse.modules.watcher import SiteWatcher
+ - watcher = SiteWatcher(origin, destination, interval=0.5, jobs=4)
+ - watcher.watch() # never returns, unless max_cycles is given
+ - watcher.close() # stops the worker processes, watch() does it when it returns
+ - watcher.poll() -> set of the files created, modified or deleted since the last poll
+"""
+
+import os
+import time
+
+from bootstraparse.modules import sitecreator, error_mngr
+from bootstraparse.modules.manifest import METADATA_FOLDER
+
+
+class SiteWatcher:
+    """
+    Builds a website, then rebuilds it every time its sources change.
+    The environment is kept loaded between the builds, and is only reloaded when the configs or templates change.
+    So are the worker processes when jobs is more than 1, they load the environment when they start.
+    """
+    def __init__(self, origin, destination, interval=0.5, jobs=1, parse_cache=True):
+        """
+        :param origin: The path of the website to be built.
+        :param destination: The destination path of the built website.
+        :param interval: The number of seconds between two polls of the origin folder.
+        :param jobs: The number of worker processes used to build the pages.
+        :param parse_cache: If False, the parse cache is disabled.
+        :type origin: str
+        :type destination: str
+        :type interval: float
+        :type jobs: int
+        :type parse_cache: bool
+        """
+        self.origin = origin
+        self.destination = destination
+        self.interval = interval
+        self.jobs = jobs
+        self.parse_cache = parse_cache
+        self.env = sitecreator.create_environment(origin, destination, parse_cache)
+        self.pool = None
+        self.snapshot = {}
+        self.pending = set()
+        self.interrupted = False
+        self._last_poll = 0
+        self._ignored = {os.path.abspath(destination), os.path.abspath(os.path.join(origin, METADATA_FOLDER))}
+        self._env_folders = tuple(os.path.join(os.path.abspath(origin), folder) + os.sep for folder in ("configs", "templates"))
+
+    def scan(self):
+        """
+        Lists every file of the origin folder with its modification time and size.
+        :return: A dictionary of absolute paths to (mtime, size) tuples.
+        :rtype: dict[str, (int, int)]
+        """
+        files = {}
+        folders = [os.path.abspath(self.origin)]
+        while folders:
+            try:
+                entries = list(os.scandir(folders.pop()))
+            except FileNotFoundError:  # Deleted while scanning, the next poll will notice it
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if entry.path not in self._ignored:
+                            folders.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def poll(self):
+        """
+        Scans the origin folder and compares it to the previous scan.
+        :return: The absolute paths of the files created, modified or deleted since the previous poll.
+        :rtype: set[str]
+        """
+        snapshot = self.scan()
+        changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        self._last_poll = time.monotonic()
+        return changed
+
+    def should_stop(self):
+        """
+        Called between the pages of a rebuild, polls the origin folder at most once per interval.
+        :return: True if files changed, in which case they are kept for the next rebuild.
+        :rtype: bool
+        """
+        if time.monotonic() - self._last_poll < self.interval:
+            return False
+        changed = self.poll()
+        if changed:
+            self.pending |= changed
+            self.interrupted = True
+        return self.interrupted
+
+    def rebuild(self, changed=None):
+        """
+        Rebuilds the pages depending on the changed files, all the pages are checked if changed is None.
+        The environment is reloaded first if a config or template changed.
+        :param changed: The absolute paths of the files that changed.
+        :type changed: set[str] | None
+        :return: 0 if everything went well, 1 otherwise.
+        :rtype: int
+        """
+        if changed is not None and any(path.startswith(self._env_folders) for path in changed):
+            self.env = sitecreator.create_environment(self.origin, self.destination, self.parse_cache)
+            self.close()  # The workers still hold the previous environment
+            changed = None
+        if self.pool is None and self.jobs > 1:
+            self.pool = sitecreator.make_pool(self.env, self.jobs)
+        self.interrupted = False
+        return_code = sitecreator.build_website(self.env, self.jobs, changed=changed, stop=self.should_stop, pool=self.pool)
+        if self.interrupted:
+            # Pages of the interrupted rebuild that were not built yet must be rebuilt with the new changes
+            self.pending |= changed if changed is not None else self.snapshot.keys()
+            error_mngr.log_message("Rebuild interrupted by new changes.", level="INFO")
+        return return_code
+
+    def close(self):
+        """
+        Stops the worker processes, new ones are started by the next rebuild.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def watch(self, max_cycles=None):
+        """
+        Builds the website on the first call, then polls the origin folder forever and rebuilds what changed.
+        :param max_cycles: If given, the number of polls after which the function returns.
+        :type max_cycles: int | None
+        :return: The return code of the last build.
+        :rtype: int
+        """
+        return_code = 0
+        try:
+            if not self.snapshot:
+                self.poll()
+                return_code = self.rebuild()
+            cycles = 0
+            while max_cycles is None or cycles < max_cycles:
+                cycles += 1
+                time.sleep(max(0, self.interval - (time.monotonic() - self._last_poll)))
+                self.pending |= self.poll()
+                if self.pending:
+                    changed, self.pending = self.pending, set()
+                    error_mngr.log_message(f"Rebuilding after {len(changed)} change(s).", level="INFO")
+                    return_code = self.rebuild(changed)
+        finally:
+            self.close()
+        return return_code
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+# Sources of the small website edited by the tests of the incremental builds
+SITE_FILES = {
+    "index.bpr": "*Index*\n:: <_nav.bpr>",
+    "page.bpr": "# Page #",
+    "_nav.bpr": "<<nav\n:: <_links.bpr>\nnav>>\n",
+    "_links.bpr": "[home]('index.html')\n",
+    "image.png": "not really an image",
+    "configs/aliases.yaml": "shortcuts:\n  name: 'bootstraparse'",
+}
+
+
+class Site:
+    """
+    Website written in a temporary folder, with helpers to edit its sources and to tell whether its outputs were rebuilt.
+    """
+    def __init__(self, folder):
+        self.base = os.path.join(folder, "base")
+        self.dest = os.path.join(folder, "dest")
+
+    def write(self, path, content):
+        path = os.path.join(self.base, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        # Make sure the modification is seen even on file systems with a coarse mtime
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+
+    def tamper(self, path):
+        """
+        Replaces the content of an output file, so we can tell whether it was rebuilt
+        """
+        with open(os.path.join(self.dest, path), "w") as f:
+            f.write("tampered")
+
+    def tampered(self, path):
+        with open(os.path.join(self.dest, path)) as f:
+            return f.read() == "tampered"
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    """
+    The sources of SITE_FILES, written once per test module.
+    """
+    site = Site(str(tmp_path_factory.mktemp("site")))
+    for path, content in SITE_FILES.items():
+        site.write(path, content)
+    return site
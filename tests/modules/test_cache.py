@@ -0,0 +1,130 @@
+import os
+import tempfile
+from io import StringIO
+
+import pytest
+
+from bootstraparse.modules import cache, parser, sitecreator
+
+_TEMP_DIRECTORY = tempfile.TemporaryDirectory()
+text = "<<div\n*Hello* **world**\n# Title #\ndiv>>\n"
+
+
+@pytest.fixture
+def parse_cache():
+    folder = tempfile.mkdtemp(dir=_TEMP_DIRECTORY.name)
+    return cache.ParseCache(folder)
+
+
+def test_put_get(parse_cache):
+    assert parse_cache.get(text) is None
+    tokens = parser.parse_line(StringIO(text))
+    parse_cache.put(text, tokens)
+    cached = parse_cache.get(text)
+    assert cached == tokens
+    assert cached is not parse_cache.get(text)
+    assert (parse_cache.hits, parse_cache.misses) == (2, 1)
+
+
+def test_parse_line_with_cache(parse_cache):
+    tokens = parser.parse_line(StringIO(text), parse_cache)
+    assert parse_cache.misses == 1
+    assert parser.parse_line(StringIO(text), parse_cache) == tokens
+    assert parse_cache.hits == 1
+    assert tokens == parser.parse_line(StringIO(text))
+
+
+def test_grammar_change_empties_cache(parse_cache):
+    parse_cache.put(text, [])
+    assert cache.ParseCache(parse_cache.folder).get(text) == []
+    with open(os.path.join(parse_cache.folder, cache.VERSION_FILE), "w") as f:
+        f.write("older grammar")
+    assert cache.ParseCache(parse_cache.folder).get(text) is None
+
+
+def test_unreadable_entry(parse_cache):
+    with open(parse_cache.path(text), "wb") as f:
+        f.write(b"not a pickle")
+    assert parse_cache.get(text) is None
+    assert not os.path.exists(parse_cache.path(text))
+
+
+def test_evict_least_recently_used(parse_cache):
+    for i in range(3):
+        parse_cache.put(f"text {i}", ["x" * 1000])
+        os.utime(parse_cache.path(f"text {i}"), ns=(i * 10 ** 9, i * 10 ** 9))
+    parse_cache.get("text 0")  # Most recently used
+    parse_cache.max_size = 2 * os.path.getsize(parse_cache.path("text 0"))
+    assert parse_cache.evict() == 1
+    assert parse_cache.get("text 1") is None
+    assert parse_cache.get("text 0") is not None and parse_cache.get("text 2") is not None
+
+
+def test_cached_build_is_identical():
+    origin = os.path.join(_TEMP_DIRECTORY.name, "site")
+    os.makedirs(origin)
+    with open(os.path.join(origin, "index.bpr"), "w") as f:
+        f.write(text)
+    outputs = []
+    for parse_cache in (True, True, False):
+        destination = os.path.join(_TEMP_DIRECTORY.name, "build")
+        assert sitecreator.create_website(origin, destination, full_rebuild=True, parse_cache=parse_cache) == 0
+        with open(os.path.join(destination, "index.html")) as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert len(cache.ParseCache(os.path.join(destination, ".bootstraparse", "parse_cache")).entries()) == 1
+    assert sitecreator.create_environment(origin, destination, parse_cache=False).parse_cache is None
+
+
+def test_lru_cache():
+    memo = cache.LRUCache(max_size=2)
+    assert memo.hit_rate == 0
+    memo.put("a", 1)
+    memo.put("b", 2)
+    assert memo.get("a") == 1
+    memo.put("c", 3)
+    assert memo.get("b") is None
+    assert len(memo) == 2 and memo.get("c") == 3
+    assert (memo.hits, memo.misses, memo.hit_rate) == (2, 1, 2 / 3)
+    memo.max_size = 0
+    memo.put("d", 4)
+    assert memo.get("d") is None
+    memo.clear()
+    assert len(memo) == 0 and memo.hits == memo.misses == 0
+
+
+@pytest.mark.parametrize("content", [b"", b"one\ntwo\n", b"one\r\ntwo\rthree", b"\n\n\xc3\xa9t\xc3\xa9\x0cpage\n",
+                                     b"\r\n\r\r\n\n", b"a\xe2\x80\xa8b\x1cc\xc2\x85\r"])
+def test_read_lines(content):
+    path = os.path.join(tempfile.mkdtemp(dir=_TEMP_DIRECTORY.name), "source.bpr")
+    with open(path, "wb") as f:
+        f.write(content)
+    with open(path, "r") as f:
+        assert cache.read_lines(path) == tuple(f.readlines())
+
+
+def test_source_cache():
+    folder = tempfile.mkdtemp(dir=_TEMP_DIRECTORY.name)
+    path = os.path.join(folder, "source.bpr")
+    with open(path, "w") as f:
+        f.write("one\ntwo\n")
+    sources = cache.SourceCache()
+    lines = sources.lines(path)
+    assert lines == ("one\n", "two\n")
+    assert sources.lines(os.path.join(folder, ".", "source.bpr")) is lines
+    assert (sources.reads, len(sources)) == (1, 1)
+    with pytest.raises(FileNotFoundError):
+        sources.lines(os.path.join(folder, "missing.bpr"))
+    assert len(sources) == 1
+    sources.clear()
+    assert (sources.reads, len(sources)) == (0, 0)
+    assert sources.lines(path) == lines and sources.reads == 1
+
+
+def test_source_cache_expand():
+    sources = cache.SourceCache()
+    assert sources.expand("fragment.bpr", lambda: "text\n") == "text\n"
+    assert sources.expand(os.path.abspath("fragment.bpr"), lambda: "other\n") == "text\n"
+    assert (sources.expansions, sources.reused_expansions, sources.reused_size) == (1, 1, 5)
+    sources.clear()
+    assert (len(sources.expanded), sources.expansions, sources.reused_expansions, sources.reused_size) == (0, 0, 0, 0)
@@ -696,3 +696,46 @@ def test_finalize_pile(base_cm):
     base_cm.pile[0] = sy.TextToken(['e'])
     with pytest.raises(TypeError):
         base_cm.finalize_pile()
+
+
+def test_get_last_container_skips_empty_containers(base_cm):
+    base_cm.pile = [context_mngr.SeContainer([sy.TextToken(['e'])]), context_mngr.BaseContainer(), None, None]
+    assert base_cm.get_last_container_in_pile(3) is base_cm.pile[0]
+
+
+def test_long_page():
+    depth = 9000
+    tokens = []
+    for _ in range(depth):
+        tokens += [sy.StructuralElementStartToken(['div']), sy.Linebreak([]), sy.EtEmToken(['*']), sy.TextToken(['a']),
+                   sy.EtEmToken(['*']), sy.TextToken(['b']), sy.Linebreak([])]
+    for _ in range(depth):
+        tokens += [sy.StructuralElementEndToken(['div']), sy.OptionalToken([sy.OptionalInsertToken(["class='blue'"])]),
+                   sy.Linebreak([]), sy.TextToken(['text']), sy.Linebreak([])]
+    assert len(tokens) >= 100000
+
+    pile = context_mngr.ContextManager(tokens)()
+    container, levels = pile[0], 0
+    while isinstance(container, context_mngr.SeContainer):
+        assert container.optionals is not None
+        levels += 1
+        container = next((c for c in container.content[1:] if isinstance(c, context_mngr.SeContainer)), None)
+    assert levels == depth
+
+
+def test_slotted_containers():
+    container = context_mngr.EtEmContainer([sy.TextToken(['a'])])
+    assert not hasattr(container, "__dict__")
+    assert container._map is None and container._others is None
+    assert container.get_others() == {} and container.get_map() == {}
+    assert container.validate([]) and not container.validate(['colspan'])
+    assert container._map is None and container._others is None
+    container.others["url"] = "a"
+    assert container.get_others() == {"url": "a"}
+
+    cells = [context_mngr.TableCellContainer(), context_mngr.TableCellContainer()]
+    assert cells[0].validate(['colspan']) and cells[0]._map is None
+    cells[0].map['colspan'] = lambda: "2"
+    assert cells[0] >> 'colspan' == "2"
+    assert cells[1].get_map() == {'colspan': ""}
+    assert context_mngr.HeaderContainer(others={"header_level": 1}).get_others() == {"header_level": 1}
@@ -230,3 +230,36 @@ def test_container_export_value(container, export_v, line):
     em = export.ExportManager(__config, __templates)
     assert isinstance(container, context_mngr.BaseContainer)
     assert container.export(em) == export_v
+
+
+def _nested(depth, leaf="deep"):
+    container = context_mngr.TextContainer([sy.TextToken([leaf])])
+    for i in range(depth):
+        container = (context_mngr.EtEmContainer if i % 2 else context_mngr.EtStrongContainer)([container])
+    return container
+
+
+def test_render_deep_tree():
+    __config = config.ConfigLoader(pathresolver.b_path("configs/"))
+    __templates = config.ConfigLoader(pathresolver.b_path("templates/"))
+    em = export.ExportManager(__config, __templates)
+    strong, em_ = em(export.ExportRequest("inline_elements", "strong")), em(export.ExportRequest("inline_elements", "em"))
+    assert _nested(2).export(em) == em_.start + strong.start + "deep" + strong.end + em_.end
+
+    depth = 20000  # Much deeper than the recursion limit
+    output = []
+    context_mngr.render([_nested(depth), type("Markup", (str,), {})("\n"), _nested(1, "wide")], em, output.append)
+    output = "".join(output)
+    assert output.count(strong.start) == depth // 2 + 1
+    assert output.startswith(em_.start + strong.start + em_.start)
+    assert output.endswith(em_.end + strong.end + em_.end + "\n" + strong.start + "wide" + strong.end)
+
+
+def test_get_content():
+    __config = config.ConfigLoader(pathresolver.b_path("configs/"))
+    __templates = config.ConfigLoader(pathresolver.b_path("templates/"))
+    em = export.ExportManager(__config, __templates)
+    children = [context_mngr.TextContainer([sy.TextToken([str(i)])]) for i in range(3)]
+    container = context_mngr.EtEmContainer(children + [sy.TextToken(["ignored"])])
+    assert container.get_content(em) == "0 1 2"
+    assert container.get_content(em, children[1:]) == "1 2"
@@ -1,9 +1,10 @@
+from io import StringIO
 from itertools import zip_longest
 
 import bootstraparse.modules.export as export
 import pytest
 
-from bootstraparse.modules import context_mngr, syntax, config, pathresolver
+from bootstraparse.modules import context_mngr, syntax, config, pathresolver, parser
 from bootstraparse.modules.tools import __GLk
 
 __config = config.ConfigLoader(pathresolver.b_path("configs/"))
@@ -190,3 +191,73 @@ def test_context_cov():
 
     assert convr == convr
     assert convr != A()
+
+
+def test_context_sink():
+    em = export.ExportManager(__config, __templates)
+    lst = [context_mngr.TextContainer([syntax.TextToken(["first"])]), context_mngr.TextContainer([syntax.TextToken(["second"])])]
+    sink = StringIO()
+    sink.write("before ")
+    convr = export.ContextConverter(lst, em, "Undefined", sink)
+    assert convr.process_pile() is sink
+    assert sink.getvalue() == "before firstsecond"
+    assert sink.tell() == len("before firstsecond")
+
+
+def test_context_sink_streams_containers():
+    class Sink(list):
+        write = list.append
+
+    em = export.ExportManager(__config, __templates)
+    pile = context_mngr.ContextManager(parser.parse_line(StringIO("<<div\nfirst\nsecond\ndiv>>\n")))()
+    assert isinstance(pile[0], context_mngr.SeContainer)
+    sink = Sink()
+    export.ContextConverter(pile, em, "Undefined", sink).process_pile()
+    # Even wrapped in a single container, the page is written fragment by fragment
+    assert len(sink) > len(pile) + 2
+    assert "".join(sink) == export.ContextConverter(pile, em, "Undefined").process_pile().read()
+
+
+@pytest.mark.parametrize("template, values", [
+    ("<br>", {}),
+    ("<h{header_level}>", {"header_level": 2}),
+    ("<div{optionals}>", {"optionals": " class=\"a\""}),
+    ("<h{header_level}{optionals}>{header_level}", {"header_level": "3", "optionals": ""}),
+    ("<td colspan=\"{col_span:>3}\">", {"col_span": 2}),
+    ("<a href=\"{url!r}\">", {"url": "x"}),
+])
+def test_compile_template(template, values):
+    assert export.compile_template(template)(**values) == template.format(**values)
+
+
+def test_missing_template_at_load():
+    templates = {"bootstrap": {k: dict(v) for k, v in __templates["bootstrap"].items()}}
+    del templates["bootstrap"]["inline_elements"]["em"]
+    with pytest.raises(KeyError):
+        export.ExportManager(__config, templates)
+
+
+def test_request_key():
+    strong = export.ExportRequest("inline_elements", "strong", syntax.OptionalToken([]))
+    assert export.request_key(strong) == export.request_key(export.ExportRequest("inline_elements", "strong", ""))
+    assert export.request_key(export.ExportRequest("structural_elements", "se_div", _opts)) != export.request_key(
+        export.ExportRequest("structural_elements", "se_div", ""))
+    first = export.ExportRequest("structural_elements", "header", "", {"header_level": 1, "id": ["a"]})
+    second = export.ExportRequest("structural_elements", "header", "", {"id": ["a"], "header_level": 1})
+    assert export.request_key(first) == export.request_key(second)
+    assert export.request_key(export.ExportRequest("inline_elements", "link", "", {"url": {1}})) is None
+    # Keys of different types can't be compared, and equal values of different types must not share a response
+    assert export.request_key(export.ExportRequest("inline_elements", "link", "", {"url": {1: "a", "b": 2}})) is not None
+    assert len({export.freeze(value) for value in (1, 1.0, True, [1], (1,), {1: 1}, [(1, 1)])}) == 7
+    assert export.freeze({"b": 1, 2: 3, "a": None}) == export.freeze({"a": None, 2: 3, "b": 1})
+
+
+def test_response_cache():
+    em = export.ExportManager(__config, __templates)
+    request = export.ExportRequest("structural_elements", "header", "", {"header_level": 2})
+    assert em(request) == em(request) == em.transform(request)
+    assert (em.responses.hits, em.responses.misses) == (1, 1)
+    assert em(export.ExportRequest("structural_elements", "header", "", {"header_level": 3})) != em(request)
+    assert len(em.responses) == 2
+    em(export.ExportRequest("inline_elements", "link", "", {"url": {1}}))
+    assert len(em.responses) == 2
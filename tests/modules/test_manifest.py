@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from bootstraparse.modules import manifest, sitecreator
+
+
+@pytest.fixture(scope="module", autouse=True)
+def built_site(site):
+    assert sitecreator.create_website(site.base, site.dest) == 0
+
+
+def test_manifest_content(site):
+    with open(os.path.join(site.dest, manifest.METADATA_FOLDER, manifest.MANIFEST_NAME)) as f:
+        saved = json.load(f)
+    assert saved["version"] == manifest.MANIFEST_VERSION
+    assert set(saved["pages"]) == {"index.html", "page.html"}
+    assert set(saved["assets"]) == {"image.png"}
+    assert sorted(os.path.basename(p) for p in saved["pages"]["index.html"]["dependencies"]) == \
+        ["_links.bpr", "_nav.bpr", "index.bpr"]
+
+
+def test_unchanged_site_is_skipped(site):
+    site.tamper("index.html")
+    site.tamper("page.html")
+    site.tamper("image.png")
+    assert sitecreator.create_website(site.base, site.dest) == 0
+    assert site.tampered("index.html") and site.tampered("page.html") and site.tampered("image.png")
+
+
+def test_changed_import_rebuilds_importers(site):
+    site.tamper("index.html")
+    site.tamper("page.html")
+    site.write("_links.bpr", "[home]('other.html')\n")
+    assert sitecreator.create_website(site.base, site.dest) == 0
+    assert not site.tampered("index.html")
+    assert site.tampered("page.html")
+
+
+def test_changed_config_rebuilds_all(site):
+    site.tamper("index.html")
+    site.tamper("page.html")
+    site.write("configs/aliases.yaml", "shortcuts:\n  name: 'bootstraparse!'")
+    assert sitecreator.create_website(site.base, site.dest) == 0
+    assert not site.tampered("index.html")
+    assert not site.tampered("page.html")
+
+
+def test_full_rebuild(site):
+    site.tamper("page.html")
+    assert sitecreator.create_website(site.base, site.dest, full_rebuild=True) == 0
+    assert not site.tampered("page.html")
+
+
+def test_removed_source(site):
+    site.write("gone.bpr", "Soon gone")
+    site.write("gone.txt", "Soon gone")
+    assert sitecreator.create_website(site.base, site.dest) == 0
+    assert os.path.exists(os.path.join(site.dest, "gone.html"))
+    os.remove(os.path.join(site.base, "gone.bpr"))
+    os.remove(os.path.join(site.base, "gone.txt"))
+    assert sitecreator.create_website(site.base, site.dest) == 0
+    assert not os.path.exists(os.path.join(site.dest, "gone.html"))
+    assert not os.path.exists(os.path.join(site.dest, "gone.txt"))
+
+
+def test_failed_page_is_rebuilt(site):
+    site.write("broken.bpr", "div>>")
+    assert sitecreator.create_website(site.base, site.dest) == 1
+    env = sitecreator.create_environment(site.base, site.dest)
+    build_manifest = manifest.BuildManifest(site.dest, env)
+    assert "broken.html" not in build_manifest.pages
+    assert build_manifest.needs_build(os.path.join(site.base, "broken.bpr"), os.path.join(site.dest, "broken.html"))
+    os.remove(os.path.join(site.base, "broken.bpr"))
+
+
+def test_unreadable_manifest(site):
+    path = os.path.join(site.dest, manifest.METADATA_FOLDER, manifest.MANIFEST_NAME)
+    with open(path, "w") as f:
+        f.write("{not json")
+    env = sitecreator.create_environment(site.base, site.dest)
+    build_manifest = manifest.BuildManifest(site.dest, env)
+    assert build_manifest.pages == {}
+    build_manifest.save()
+    assert manifest.BuildManifest(site.dest, env).pages == {}
+
+
+def test_hash_file(site):
+    assert manifest.hash_file(os.path.join(site.base, "nope.bpr")) is None
+    assert manifest.hash_file(os.path.join(site.base, "page.bpr")) == manifest.hash_file(os.path.join(site.base, "page.bpr"))
+    assert manifest.hash_file(os.path.join(site.base, "page.bpr")) != manifest.hash_file(os.path.join(site.base, "index.bpr"))
@@ -58,3 +58,23 @@ def test_parse_line():
     list_parsed = parser.parse_line(complete_list)
     for element, expected in zip_longest(list_parsed, expected_list):
         assert element.__class__ == expected
+
+
+def test_line_memo():
+    parser.line_memo.clear()
+    first = parser.parse_line(StringIO("<<div\n*text*\n<<div\n"))
+    assert (parser.line_memo.hits, parser.line_memo.misses) == (1, 2)
+    assert parser.line_memo.hit_rate == 1 / 3
+    # Tokens are fresh copies, mutating them doesn't alter the memo
+    div1, div2 = [token for token in first if isinstance(token, syntax.StructuralElementStartToken)]
+    div1.line_number = 12
+    assert div1 == div2 and div1 is not div2
+    assert parser.parse_line(StringIO("<<div\n"))[0].line_number == "Undefined"
+
+
+def test_iter_tokens():
+    io = StringIO("# Title #\nsome text\n")
+    tokens = parser.iter_tokens(io)
+    assert isinstance(next(tokens), syntax.HeaderToken)
+    assert io.tell() == len("# Title #\n")  # The second line isn't read yet
+    assert [token.__class__ for token in tokens] == [syntax.Linebreak, syntax.TextToken, syntax.Linebreak]
@@ -8,9 +8,10 @@ from itertools import zip_longest
 import pytest
 import rich
 
-from bootstraparse.modules import preparser, config, pathresolver
+from bootstraparse.modules import preparser, config, pathresolver, syntax
 from bootstraparse.modules import environment
 from bootstraparse.modules import export
+from bootstraparse.modules import cache
 
 ###############################################################################
 # Environment variables
@@ -403,3 +404,86 @@ def test_make_replacement_errors():
     assert pp.make_replacements("This is a test {}", "images") == "This is a test images"
     assert pp.make_replacements("This is a test {} {} {image} {b}", 1, 2, image="images", b="b") == "This is a test 1 2 images b"  # noqa: E501
     assert pp.make_replacements("This is a test {} {} {image} {b}", karm=3) == "This is a test {} {} {image} {b}"
+
+
+def test_source_cache_reads_once():
+    shared_env = environment.Environment()
+    shared_env.config = env.config
+    shared_env.export_mngr = env.export_mngr
+    shared_env.source_cache = cache.SourceCache()
+    fragment = temp_name("source_cache/fragment.bpr")
+    make_new_file(fragment, "Fragment\n")
+    pages = [temp_name(f"source_cache/page{i}.bpr") for i in range(2)]
+    for page in pages:
+        make_new_file(page, "Title\n::< fragment.bpr >\n::< fragment.bpr >\nEnd\n")
+
+    outputs = [preparser.PreParser(page, shared_env).do_imports().getvalue() for page in pages]
+    assert outputs == ["Title\nFragment\nFragment\nEnd\n"] * 2
+    assert shared_env.source_cache.reads == 3
+    # Only the imported file is kept expanded, not the pages
+    assert (shared_env.source_cache.expansions, shared_env.source_cache.reused_expansions) == (1, 3)
+    assert list(shared_env.source_cache.expanded) == [os.path.abspath(fragment)]
+    assert preparser.PreParser(pages[0], env).do_imports().getvalue() == outputs[0]
+
+
+def reference_replacements(pp, text):
+    """
+    Replaces the images and aliases of a text with syntax.line_to_replace, the grammar the engine emulates.
+    """
+    output = []
+    for line in StringIO(text).readlines():
+        for match in syntax.line_to_replace.parse_string(line):
+            if match.label == 'text':
+                output.append(match.content[0])
+            elif match.label == 'image':
+                output.append(pp.get_image_from_config(match.content.image_name, match.content.optional))
+            else:
+                output.append(pp.get_alias_from_config(match.content.alias_name, match.content.optional))
+        output.append("\n")
+    return "".join(output)
+
+
+@pytest.mark.parametrize("text", [
+    "", "no markers\n", "no line break", "\ttabs\tare\texpanded\n",
+    "x @{img} dropped tail\n", "@[alias] before @{img} is kept\n", "  @{ a }  between @[ b ] @[c]\n",
+    "@[a]{{cls}} {html insert} [1, x=2] after\n", "@{i}{bad~} [unclosed\n", "@{unclosed\n@[x]\n\t@[y]\tz",
+])
+def test_replace_markers(text):
+    pp = preparser.PreParser(temp_name("test_replace_markers.bpr"), env)
+    pp.get_image_from_config = lambda name, optionals: f"<image {name} {tuple(syntax.split_optionals(optionals))}>"
+    pp.get_alias_from_config = lambda name, optionals: f"<alias {name} {tuple(syntax.split_optionals(optionals))}>"
+    pp.file_with_all_imports.write(text)
+    pp.file_with_all_imports.seek(0)
+    assert pp.parse_shortcuts_and_images().read() == reference_replacements(pp, text)
+
+
+def test_alias_table():
+    table = preparser.AliasTable(env.config, env.export_mngr)
+    assert table.render('shortcuts', 'do_not_remove_s', None) == "This is a test"
+    assert table.render('images', 'do_not_remove_p', None) == '<img src="This is a test"/>'
+    assert table.render('shortcuts', 'not_existing', None) is None
+    optionals = syntax.located_optional.parse_string("[1, 2, a=3, b='x']")[1][0]
+    assert table.render('shortcuts', 'do_not_remove_f', optionals) == "This is a test 1 2 3 x"
+    assert table.render('shortcuts', 'do_not_remove_f', optionals) == "This is a test 1 2 3 x"
+    assert (len(table.rendered), table.rendered.hits) == (3, 1)
+
+    pp = preparser.PreParser(temp_name("test_alias_table.bpr"), env)
+    assert pp.get_alias_table() is env.alias_table is pp.get_alias_table()
+    with pytest.raises(KeyError):
+        pp.get_alias_from_config("not_existing", None)
+
+
+@pytest.mark.parametrize("content", [
+    "", "no imports\n", "a :: b\n::< one.bpr >\n", "text\n\n::<one.bpr> <two.bpr>\n::<three.bpr>",
+    "\t::\t<tab.bpr>\t\n: : <no.bpr>\n:: no bracket\n::<first.bpr>::<second.bpr>\n",
+])
+def test_parse_import_list_scanner(content):
+    test_file = temp_name("test_import_scanner.bpr")
+    make_new_file(test_file, content)
+    pp = preparser.PreParser(test_file, env)
+    expected = []
+    for line_count, line in enumerate(pp.readlines()):
+        results = syntax.rgx_import_file.search_string(line)
+        if results:
+            expected += [(pp.relative_path_resolver(e.rstrip()), line_count) for e in results[0]]
+    assert pp.parse_import_list() == expected
@@ -0,0 +1,198 @@
+import json
+import os
+import pstats
+import tempfile
+import time
+from io import StringIO
+
+from bootstraparse.modules import cache, profiler, sitecreator
+
+_TEMP_DIRECTORY = tempfile.TemporaryDirectory()
+
+
+def cached_entries(destination):
+    """
+    Returns the number of pages in the parse cache of a destination.
+    """
+    folder = os.path.join(destination, ".bootstraparse", "parse_cache")
+    return len([name for name in os.listdir(folder) if name != cache.VERSION_FILE]) if os.path.isdir(folder) else 0
+
+
+def test_nested_stages():
+    timer = profiler.StageTimer()
+    with timer.stage("outer"):
+        time.sleep(0.02)
+        with timer.stage("inner"):
+            time.sleep(0.05)
+    with timer.stage("inner"):
+        pass
+    assert set(timer.times) == {"outer", "inner"}
+    # Only lower bounds: time.sleep may overshoot by any amount on a loaded machine
+    assert timer.times["outer"][0] >= 0.02
+    assert timer.times["inner"][0] >= 0.05
+    assert timer.times["outer"][0] < timer.times["inner"][0]
+
+
+def test_timed_sink():
+    timer = profiler.StageTimer()
+    file = StringIO()
+    sink = timer.sink("write", file)
+    with timer.stage("export"):
+        assert sink.write("text") == 4
+    assert file.getvalue() == "text"
+    assert set(timer.times) == {"export", "write"}
+
+
+def test_null_timer():
+    file = StringIO()
+    with profiler.NULL_TIMER.stage("anything"):
+        pass
+    assert profiler.NULL_TIMER.sink("write", file) is file
+    assert profiler.NULL_TIMER.times is None
+
+
+def test_profile_stages_report():
+    origin = os.path.join(_TEMP_DIRECTORY.name, "site")
+    destination = os.path.join(_TEMP_DIRECTORY.name, "dest")
+    os.makedirs(origin)
+    for name, content in (("small.bpr", "text\n"), ("big.bpr", ":: <_part.bpr>\n" + "*text* **strong**\n" * 300),
+                          ("_part.bpr", "# Title #\n"), ("broken.bpr", "div>>\n")):
+        with open(os.path.join(origin, name), "w") as f:
+            f.write(content)
+    assert sitecreator.create_website(origin, destination, profile_stages=True) == 1
+    with open(os.path.join(destination, ".bootstraparse", sitecreator.PROFILE_STAGES_REPORT)) as f:
+        report = json.load(f)
+    assert set(report["build"]) == {"crawl"}
+    assert set(report["stages"]) == {"imports", "replacements", "parsing", "contextualization", "export", "write"}
+    assert {os.path.basename(page["source"]) for page in report["pages"]} == {"big.bpr", "small.bpr", "broken.bpr"}
+    assert report["pages"][0]["source"].endswith("big.bpr") and report["pages"][0]["error"] is None
+    # The stages run before the error are reported
+    broken = next(page for page in report["pages"] if page["source"].endswith("broken.bpr"))
+    assert broken["error"].startswith("MismatchedContainerError") and "parsing" in broken["stages"]
+    assert report["pages"][0]["wall"] == sum(stage["wall"] for stage in report["pages"][0]["stages"].values())
+
+    # Profiling rebuilds every page, without the parse cache
+    assert sitecreator.create_website(origin, destination, profile_stages=True) == 1
+    with open(os.path.join(destination, ".bootstraparse", sitecreator.PROFILE_STAGES_REPORT)) as f:
+        assert {os.path.basename(page["source"]) for page in json.load(f)["pages"]} == {"big.bpr", "small.bpr", "broken.bpr"}
+    assert cached_entries(destination) == 0
+
+
+def test_reports_skip_pages_without_stages():
+    path = os.path.join(_TEMP_DIRECTORY.name, "reports", "report.json")
+    empty = sitecreator.PageReport("page.bpr", "page.html", "OSError: unreadable")
+    profiler.write_report(path, {}, [empty])
+    with open(path) as f:
+        assert json.load(f)["pages"] == []
+    profiler.write_memory_report(path, {"peak": 0, "stages": {}}, [empty])
+    with open(path) as f:
+        assert json.load(f)["pages"] == []
+
+
+def test_matches_any():
+    assert profiler.matches_any(os.path.join("pages", "page.bpr"), ["pages/*.bpr"])
+    assert profiler.matches_any("index.bpr", ["pages/*", "index.*"])
+    assert not profiler.matches_any("index.bpr", ["pages/*"])
+
+
+def test_profile_call():
+    path = os.path.join(_TEMP_DIRECTORY.name, "call.pstats")
+    assert profiler.profile_call(path, sum, [1, 2]) == 3
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_profile_pages():
+    origin = os.path.join(_TEMP_DIRECTORY.name, "profiled")
+    destination = os.path.join(_TEMP_DIRECTORY.name, "profiled_dest")
+    os.makedirs(os.path.join(origin, "pages"))
+    for name in ("index.bpr", os.path.join("pages", "page.bpr")):
+        with open(os.path.join(origin, name), "w") as f:
+            f.write("<<div\n*text*\ndiv>>\n")
+    assert sitecreator.create_website(origin, destination, profile_pages=["pages/*.bpr"]) == 0
+    assert not os.path.exists(os.path.join(destination, "index.html.pstats"))
+    stats = pstats.Stats(os.path.join(destination, "pages", "page.html.pstats"))
+    assert any(function == "_build_page" for _, _, function in stats.stats)
+
+    # The profiled page is rebuilt and parsed again, the other one is up to date
+    os.remove(os.path.join(destination, "pages", "page.html.pstats"))
+    assert sitecreator.create_website(origin, destination, profile_pages=["pages/*.bpr"]) == 0
+    stats = pstats.Stats(os.path.join(destination, "pages", "page.html.pstats"))
+    assert any(function == "iter_tokens" for _, _, function in stats.stats)
+    assert cached_entries(destination) == 1
+
+
+def test_module_name():
+    assert profiler.module_name(profiler.__file__) == "bootstraparse.modules.profiler"
+    assert profiler.module_name("/nowhere/file.py") == "/nowhere/file.py"
+
+
+def test_memory_tracker():
+    tracker = profiler.MemoryTracker(profiler.StageTimer())
+    kept = []
+    try:
+        with tracker.stage("allocate"):
+            kept.append(bytearray(1_000_000))
+            temporary = [bytearray(3_000_000)]
+            del temporary
+        with tracker.stage("nothing"):
+            pass
+        assert set(tracker.times) == {"allocate", "nothing"}
+        allocate = tracker.memory["stages"]["allocate"]
+        assert allocate["peak"] >= 3_900_000
+        assert 1_000_000 <= allocate["retained"] < 2_000_000
+        assert max(allocate["modules"].values()) >= 1_000_000
+        assert tracker.memory["peak"] >= 3_900_000
+        file = StringIO()
+        assert tracker.sink("write", file).write("x") == 1
+    finally:
+        tracker.close()
+        tracker.close()
+
+
+def test_memory_report():
+    origin = os.path.join(_TEMP_DIRECTORY.name, "memory")
+    destination = os.path.join(_TEMP_DIRECTORY.name, "memory_dest")
+    os.makedirs(origin)
+    for name, content in (("small.bpr", "text\n"), ("big.bpr", "*text* **strong**\n" * 30), ("broken.bpr", "div>>\n")):
+        with open(os.path.join(origin, name), "w") as f:
+            f.write(content)
+    assert sitecreator.create_website(origin, destination, memory_report=True, profile_stages=True) == 1
+    with open(os.path.join(destination, ".bootstraparse", sitecreator.MEMORY_REPORT)) as f:
+        report = json.load(f)
+    assert set(report["build"]) == {"crawl"}
+    assert set(report["stages"]) == {"imports", "replacements", "parsing", "contextualization", "export", "write"}
+    assert {os.path.basename(page["source"]) for page in report["pages"]} == {"big.bpr", "small.bpr", "broken.bpr"}
+    assert report["peak"] >= report["pages"][0]["peak"] > 0
+    assert os.path.exists(os.path.join(destination, ".bootstraparse", sitecreator.PROFILE_STAGES_REPORT))
+
+    assert sitecreator.create_website(origin, destination, memory_report=True) == 1
+    with open(os.path.join(destination, ".bootstraparse", sitecreator.MEMORY_REPORT)) as f:
+        assert {os.path.basename(page["source"]) for page in json.load(f)["pages"]} == {"big.bpr", "small.bpr", "broken.bpr"}
+    assert cached_entries(destination) == 0
+
+
+def test_memory_tracker_nested_stages():
+    tracker = profiler.MemoryTracker()
+    try:
+        with tracker.stage("outer"):
+            temporary = bytearray(5_000_000)
+            del temporary
+            with tracker.stage("inner"):
+                pass
+        assert tracker.memory["stages"]["outer"]["peak"] >= 4_900_000
+        assert tracker.memory["stages"]["inner"]["peak"] < 1_000_000
+    finally:
+        tracker.close()
+
+
+def test_worker_stops_tracemalloc():
+    import tracemalloc
+    origin = os.path.join(_TEMP_DIRECTORY.name, "worker_memory")
+    os.makedirs(origin)
+    with open(os.path.join(origin, "page.bpr"), "w") as f:
+        f.write("text\n")
+    sitecreator._init_worker(origin, os.path.join(_TEMP_DIRECTORY.name, "worker_memory_dest"), memory_report=True)
+    report = sitecreator._build_in_worker((os.path.join(origin, "page.bpr"),
+                                           os.path.join(_TEMP_DIRECTORY.name, "worker_memory_dest", "page.html")))
+    assert report.error is None and report.memory["stages"]
+    assert not tracemalloc.is_tracing()
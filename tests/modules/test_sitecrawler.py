@@ -102,3 +102,16 @@ def test_result_crawler(list_files, env):
         assert os.path.exists(dest)
         assert os.path.isfile(dest)
         assert isinstance(pp, preparser.PreParser)
+
+
+def test_set_all_destinations(list_files, env):
+    """
+    Test the sitecrawler.SiteCrawler.set_all_destinations method
+    """
+    crw = sitecrawler.SiteCrawler(_BASE, _DEST, env)
+    pages = crw.set_all_destinations()
+    assert len(pages) == 5
+    for source, dest in pages:
+        assert os.path.isfile(source)
+        assert os.path.isfile(dest)
+    assert crw.preparsers == []
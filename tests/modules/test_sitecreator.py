@@ -3,7 +3,7 @@ import tempfile
 
 import pytest
 
-from bootstraparse.modules import sitecreator, syntax, context_mngr
+from bootstraparse.modules import sitecreator, syntax, context_mngr, parser
 
 _TEMP_DIRECTORY = tempfile.TemporaryDirectory()
 _BASE = os.path.join(_TEMP_DIRECTORY.name, "base")
@@ -64,3 +64,85 @@ def test_save(list_files, env):
     sitecreator.save(containers, os.path.join(_DEST, "filetest.html"), env)
     with open(fd, "r") as f:
         assert f.read() == "TestTest2"
+
+
+def test_create_site_parallel(list_files):
+    parallel_dest = os.path.join(_TEMP_DIRECTORY.name, "dest_parallel")
+    assert sitecreator.create_website(_BASE, parallel_dest, jobs=2) == 0
+    for file, exp in list_files:
+        if exp is not None:
+            with open(file, "rb") as serial, open(file.replace(_DEST, parallel_dest), "rb") as parallel:
+                assert serial.read() == parallel.read()
+
+
+def test_build_pages_stopped(list_files, env):
+    pages = [(os.path.join(_BASE, "test1.bpr"), os.path.join(_DEST, "test1.html"))] * 4
+    assert list(sitecreator.build_pages(pages, env, jobs=1, stop=lambda: True)) == []
+    assert list(sitecreator.build_pages(pages, env, jobs=2, stop=lambda: True)) == []
+
+
+def test_build_page_error(list_files, env):
+    broken = make_new_file("broken/broken.bpr", "div>>")
+    report = sitecreator.build_page(os.path.join(_TEMP_DIRECTORY.name, broken),
+                                    os.path.join(_DEST, "broken.html"), env)
+    assert report.source.endswith("broken.bpr")
+    assert report.error.startswith("MismatchedContainerError")
+    assert sitecreator.create_website(os.path.join(_TEMP_DIRECTORY.name, "broken"),
+                                      os.path.join(_TEMP_DIRECTORY.name, "broken_dest")) == 1
+
+
+def test_worker(list_files):
+    sitecreator._init_worker(_BASE, _DEST)
+    report = sitecreator._build_in_worker((os.path.join(_BASE, "test1.bpr"), os.path.join(_DEST, "test1.html")))
+    assert report == sitecreator.PageReport(os.path.join(_BASE, "test1.bpr"), os.path.join(_DEST, "test1.html"),
+                                            dependencies=[os.path.join(_BASE, "test1.bpr")])
+
+
+def test_worker_new_build(list_files):
+    sitecreator._init_worker(_BASE, _DEST)
+    page = (os.path.join(_BASE, "test1.bpr"), os.path.join(_DEST, "test1.html"))
+    sitecreator._build_chunk_in_worker(-1, [page])
+    sitecreator._worker_imports["stale"] = None
+    assert [report.error for report in sitecreator._build_chunk_in_worker(-1, [page, page])] == [None, None]
+    assert "stale" in sitecreator._worker_imports
+    # The imports of a previous build may have changed
+    sitecreator._build_chunk_in_worker(-2, [page])
+    assert "stale" not in sitecreator._worker_imports
+
+
+def test_token_stream_pages(list_files, env):
+    from bootstraparse.modules import preparser, export
+    page = os.path.join(_BASE, "subtests/test5.bpr")
+    outputs = []
+    for size in (None, 0):
+        containers = sitecreator.preparse_parse(preparser.PreParser(page, env), token_stream_size=size)
+        outputs.append(export.ContextConverter(containers, env.export_mngr, page).process_pile().read())
+    assert outputs[0] == outputs[1] == "<div>\n test \n</div>\n"
+    assert env.token_stream_size is None  # Opt-in
+    make_new_file("stream/configs/parser_config.yml", "parsing:\n  token_stream:\n    enabled: true\n    min_size_mb: 16\n")
+    stream_env = sitecreator.create_environment(os.path.join(_TEMP_DIRECTORY.name, "stream"),
+                                                os.path.join(_TEMP_DIRECTORY.name, "stream_dest"))
+    assert stream_env.token_stream_size == 16 * 2 ** 20
+
+
+def test_shared_import_expanded_once(caplog):
+    make_new_file("shared/_nav.bpr", "*nav*\n")
+    for page in ("a", "b", "c"):
+        make_new_file(f"shared/{page}.bpr", f"::< _nav.bpr >\n{page}\n")
+    shared_env = sitecreator.create_environment(os.path.join(_TEMP_DIRECTORY.name, "shared"),
+                                                os.path.join(_TEMP_DIRECTORY.name, "shared_dest"))
+    parser.line_memo.clear()
+    with caplog.at_level("INFO"):
+        assert sitecreator.build_website(shared_env) == 0
+    assert "Imports: 1 files expanded, reused 2 times (12 characters not expanded again)." in caplog.text
+    # The line of the import is parsed for the first page only
+    assert "Line memo: 2 of 6 lines not parsed again (33%)." in caplog.text
+    # The sources are released at the end of the build
+    assert len(shared_env.source_cache) == 0 and not shared_env.source_cache.expanded
+    caplog.clear()
+    # The counters of the worker processes are summed, at least one of the two workers builds two of the pages
+    with caplog.at_level("INFO"):
+        assert sitecreator.build_website(shared_env, jobs=2, full_rebuild=True) == 0
+    assert "files expanded, reused" in caplog.text
+    with open(os.path.join(_TEMP_DIRECTORY.name, "shared_dest", "b.html")) as f:
+        assert f.read() == "<em>nav</em>\nb\n"
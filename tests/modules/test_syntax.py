@@ -1,3 +1,5 @@
+import glob
+import pickle
 from itertools import zip_longest
 
 import pyparsing
@@ -946,3 +948,62 @@ def test_split_optionals():
     assert spl.class_insert == "cinsertBlue"
     assert spl.var_list == [123]
     assert spl.var_dict == {'class': 'blue'}
+
+
+def test_set_packrat():
+    lines = ["<<div", "*text* and **strong ~~striked~~**", "# Title #{class='blue'}", "[link]('url') text", "div>>"]
+    expected = [sy.line.parseString(line).asList() for line in lines]
+    sy.set_packrat(True, cache_size=16)
+    try:
+        assert pyparsing.ParserElement._packratEnabled
+        assert [sy.line.parseString(line).asList() for line in lines] == expected
+    finally:
+        sy.set_packrat(False)
+    assert not pyparsing.ParserElement._packratEnabled
+
+
+routed_lines = [
+    "", "\n", "   \n", "plain text\n", "  plain text  \n", "text\twith a tab\n", "a ~ b _ c ( # d\n", "x\ry\n", "été\n",
+    "# Title #\n", "## Title ##{{blue}}\n", "# not closed\n", "#. item\n", "  #. item [var=1]\n", "- item\n", "-- twice\n",
+    "! Display !\n", "!!! display !!!{class}\n", "<<div\n", "<<nowhere\n", "< less\n", "div>>\n", "Body >> {{class}}\n",
+    "Divided text\n", "| a | b |\n", "|2 a | b |\n", "|:-|:-|\n", "| not a table\n", "> quote\n", "> -- author\n",
+    "*em* **strong** ~~strike~~ __under__ (#12) ```code```\n", "[link]('https://example.com') text\n",
+]
+
+
+example_files = sorted(glob.glob(__module_path("../../../example_userfiles/**/*.bpr"), recursive=True))
+
+
+@pytest.mark.parametrize("line", routed_lines)
+def test_parse_routed_lines(line):
+    assert pickle.dumps(sy.parse_routed(line)) == pickle.dumps(sy.line.parseString(line).asList())
+
+
+@pytest.mark.parametrize("path", example_files)
+def test_parse_routed_example_files(path):
+    with open(path) as f:
+        lines = f.readlines()
+    for line in lines:
+        assert pickle.dumps(sy.parse_routed(line)) == pickle.dumps(sy.line.parseString(line).asList()), line
+
+
+def test_slotted_tokens():
+    tokens = sy.line.parseString("<<div").asList() + sy.line.parseString("# Title #{class='blue'}").asList()
+    for token in tokens + [sy.TextToken(("text",)), sy.Linebreak('')]:
+        assert not hasattr(token, "__dict__"), type(token)
+    start = tokens[0]
+    assert start.label == "se:start:div" and start.label_container == "se:start"
+    assert sy.StructuralElementStartToken.label == "se:start"
+    assert start.label is sy.line.parseString("<<div").asList()[0].label  # Interned
+    assert tokens[1].content == ("#", "Title ")
+    assert isinstance(tokens[2].content[0].content, tuple)
+
+
+def test_named_content():
+    link = sy.line.parseString("[text](http://link.com)").asList()[0]
+    assert link.content == ("[text](http://link.com)",)
+    assert (link.content.text, link.content.url) == ("text", "http://link.com")
+    copy = pickle.loads(pickle.dumps(link))
+    assert copy == link and copy.content.url == "http://link.com" and copy.label == "hyperlink"
+    image = sy.line_to_replace.parseString("@{logo}").asList()[1]
+    assert (image.content.image_name, image.content.optional) == ("logo", "")
@@ -0,0 +1,61 @@
+import glob
+from io import StringIO
+
+import pytest
+
+from bootstraparse.modules import parser, pathresolver, syntax, context_mngr, tokenstream, export, config
+
+exm = export.ExportManager(config.ConfigLoader(pathresolver.b_path("configs/")),
+                           config.ConfigLoader(pathresolver.b_path("templates/")))
+example_files = sorted(glob.glob(pathresolver.b_path("../../example_userfiles/**/*.bpr"), recursive=True))
+
+
+@pytest.mark.parametrize("path", example_files)
+def test_same_tokens(path):
+    with open(path) as f:
+        text = f.read()
+    tokens = parser.parse_line(StringIO(text))
+    stream = parser.parse_stream(StringIO(text))
+    assert len(stream) == len(tokens)
+    for expected, token in zip(tokens, stream):
+        assert type(token) is type(expected)
+        assert token == expected and str(token) == str(expected) and token.label == expected.label
+    outputs = [export.ContextConverter(context_mngr.ContextManager(t)(), exm, path).process_pile().read() for t in (tokens, stream)]
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize("text", ["", "a", "*a*\nb", "a\n\n\nb\n"])
+def test_same_lines(text):
+    assert list(parser.parse_stream(StringIO(text))) == parser.parse_line(StringIO(text))
+
+
+def test_compact():
+    text = "**Some** text\n# Header #\n\n<<div\n" * 100
+    stream = parser.parse_stream(StringIO(text))
+    assert stream.text is text or stream.text == text
+    assert len(stream.contents) == 100  # Only the contents of the headers aren't offsets
+    assert all(kind < len(tokenstream.TOKEN_CLASSES) for kind in stream.kinds)
+    assert stream[1].content == ("Some",) and stream[1].content[0] == text[2:6]
+
+
+def test_access():
+    stream = parser.parse_stream(StringIO("*a*\nb\n"))
+    assert stream[0] is stream[0] and stream[-1] is stream[len(stream) - 1]
+    assert stream[1:3] == [syntax.TextToken(("a",)), syntax.EtEmToken(("*",))]
+    with pytest.raises(IndexError):
+        stream[len(stream)]
+    stream = tokenstream.TokenStream("*a*\n", recent_size=0)
+    stream.add_line(0, "*a*\n", parser.line_tokens("*a*\n"))
+    assert stream[0] is not stream[0] and stream[0] == stream[0]
+
+
+def test_contents_kept():
+    class OtherToken(syntax.SemanticType):
+        label = "other"
+
+    other = OtherToken(("x",))
+    stream = tokenstream.TokenStream("x\n")
+    stream.add_line(0, "x\n", [other, syntax.TextToken(("not in the line",)), syntax.Linebreak('')])
+    assert stream[0] is other
+    assert stream[1] == syntax.TextToken(("not in the line",))
+    assert stream[2].content == () and stream.contents == {0: other, 1: ("not in the line",)}
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from bootstraparse.modules import watcher
+
+
+@pytest.fixture(scope="module")
+def site_watcher(site):
+    site_watcher = watcher.SiteWatcher(site.base, site.dest, interval=0)
+    assert site_watcher.watch(max_cycles=1) == 0
+    return site_watcher
+
+
+def test_initial_build(site_watcher, site):
+    assert os.path.exists(os.path.join(site.dest, "index.html"))
+    assert os.path.exists(os.path.join(site.dest, "page.html"))
+    assert os.path.join(os.path.abspath(site.base), "_nav.bpr") in site_watcher.snapshot
+
+
+def test_poll(site_watcher, site):
+    assert site_watcher.poll() == set()
+    site.write("_nav.bpr", "<<nav\n[home]('other.html')\nnav>>\n")
+    assert site_watcher.poll() == {os.path.join(os.path.abspath(site.base), "_nav.bpr")}
+    assert site_watcher.poll() == set()
+
+
+def test_changed_import_rebuilds_importers(site_watcher, site):
+    site.tamper("index.html")
+    site.tamper("page.html")
+    site.write("_nav.bpr", "<<nav\n[home]('index.html')\nnav>>\n")
+    assert site_watcher.watch(max_cycles=1) == 0
+    assert not site.tampered("index.html")
+    assert site.tampered("page.html")
+
+
+def test_changed_config_reloads_environment(site_watcher, site):
+    env = site_watcher.env
+    site.tamper("page.html")
+    site.write("configs/aliases.yaml", "shortcuts:\n  name: 'bootstraparse!'")
+    assert site_watcher.watch(max_cycles=1) == 0
+    assert site_watcher.env is not env
+    assert not site.tampered("page.html")
+
+
+def test_new_and_deleted_pages(site_watcher, site):
+    site.write("new.bpr", "# New #")
+    assert site_watcher.watch(max_cycles=1) == 0
+    assert os.path.exists(os.path.join(site.dest, "new.html"))
+    os.remove(os.path.join(site.base, "new.bpr"))
+    assert site_watcher.watch(max_cycles=1) == 0
+    assert not os.path.exists(os.path.join(site.dest, "new.html"))
+
+
+def test_interrupted_rebuild(site_watcher, site):
+    site_watcher.poll()
+    site.tamper("index.html")
+    site.tamper("page.html")
+    page = os.path.join(os.path.abspath(site.base), "page.bpr")
+    site.write("_nav.bpr", "<<nav\n[home]('other.html')\nnav>>\n")
+    site.write("page.bpr", "# Page! #")
+    # page.bpr changes again while the rebuild is running, its rebuild is interrupted then merged with the new change
+    assert site_watcher.rebuild({page, os.path.join(os.path.abspath(site.base), "_nav.bpr")}) == 0
+    assert site_watcher.interrupted
+    assert page in site_watcher.pending
+    assert site_watcher.watch(max_cycles=1) == 0
+    assert not site_watcher.interrupted
+    assert not site.tampered("index.html") and not site.tampered("page.html")
+
+
+def test_should_stop_waits_for_interval(site_watcher, site):
+    site_watcher.interval = 3600
+    site_watcher.poll()
+    site.write("page.bpr", "# Page #")
+    assert not site_watcher.should_stop()
+    site_watcher.interval = 0
+    assert site_watcher.should_stop()
+
+
+def test_scan_missing_files(site, tmp_path):
+    os.symlink("nowhere", tmp_path / "link.bpr")
+    site_watcher = watcher.SiteWatcher(str(tmp_path), site.dest)
+    assert site_watcher.scan() == {}
+    site_watcher.origin = str(tmp_path / "missing")
+    assert site_watcher.scan() == {}
+
+
+def test_worker_pool_kept_between_rebuilds(site_watcher, site):
+    parallel = watcher.SiteWatcher(site.base, site.dest, interval=0, jobs=2)
+    parallel.poll()
+    assert parallel.rebuild() == 0
+    pool = parallel.pool
+    assert pool is not None
+    site.tamper("index.html")
+    site.write("_nav.bpr", "<<nav\n[home]('index.html')\nnav>>\n")
+    assert parallel.rebuild(parallel.poll()) == 0
+    assert parallel.pool is pool
+    assert not site.tampered("index.html")
+    # The workers are restarted with the reloaded environment
+    site.write("configs/aliases.yaml", "shortcuts:\n  name: 'bootstraparse'")
+    assert parallel.rebuild(parallel.poll()) == 0
+    assert parallel.pool is not pool
+    parallel.close()
+    assert parallel.pool is None
+    parallel.close()
@@ -7,3 +7,40 @@ def test_to_test():
     args = __main__.parse(["path1", "path2"])
     assert args.origin == "path1"
     assert args.destination == "path2"
+    assert args.jobs >= 1
+
+
+def test_jobs():
+    args = __main__.parse(["path1", "path2", "--jobs", "3"])
+    assert args.jobs == 3
+
+
+def test_watch():
+    args = __main__.parse(["watch", "path1", "path2", "--interval", "2"])
+    assert args.command == "watch"
+    assert args.origin == "path1"
+    assert args.destination == "path2"
+    assert args.interval == 2
+    assert __main__.parse(["path1", "path2"]).command == "build"
+
+
+def test_no_parse_cache():
+    assert __main__.parse(["path1", "path2"]).parse_cache
+    assert not __main__.parse(["path1", "path2", "--no-parse-cache"]).parse_cache
+    assert not __main__.parse(["watch", "path1", "path2", "--no-parse-cache"]).parse_cache
+
+
+def test_profile_stages():
+    assert not __main__.parse(["path1", "path2"]).profile_stages
+    assert __main__.parse(["path1", "path2", "--profile-stages"]).profile_stages
+
+
+def test_profile_page():
+    assert __main__.parse(["path1", "path2"]).profile_pages is None
+    args = __main__.parse(["path1", "path2", "--profile-page", "pages/*.bpr", "--profile-page", "index.bpr"])
+    assert args.profile_pages == ["pages/*.bpr", "index.bpr"]
+
+
+def test_memory_report():
+    assert not __main__.parse(["path1", "path2"]).memory_report
+    assert __main__.parse(["path1", "path2", "--memory-report"]).memory_report